@@ -1,88 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
-from api.deps import get_moderator
+import asyncio
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, Dict, List, Optional
+from api.deps import get_moderator, websocket_token
+from core.event_bus import EVENT_TYPES, event_bus
+from core.security import verify_token_cached
+from core.user_cache import user_cache
 from db.models import ChatMessage, User
 from utils.encryption import decrypt_text
-from services.ai_service import ai_service
+from utils.pagination import NEWEST_FIRST, after_cursor, split_page
+from services.conversation_analysis import conversation_analyzer
+from services.dashboard import dashboard_snapshot
+from services.history import archive_collection_name, archive_collection_names
 from datetime import datetime, timedelta
 
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+EXPORT_BATCH_SIZE = 500
+EXPORT_FIELDS = ["id", "user_id", "role", "content", "emotion", "crisis", "flagged", "created_at"]
+
+
+def _message_conditions(
+    filter_emotion: Optional[str] = None,
+    filter_crisis: Optional[bool] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[Dict]:
+    """Mongo conditions shared by the message listing and the export."""
+    conditions = []
+    if filter_crisis is not None:
+        if filter_crisis:
+            conditions.append({"metadata.crisis": True})
+        else:
+            conditions.append({"metadata.crisis": {"$ne": True}})
+    if filter_emotion:
+        conditions.append({"metadata.analysis.label": filter_emotion})
+    if start is not None:
+        conditions.append({"created_at": {"$gte": start}})
+    if end is not None:
+        conditions.append({"created_at": {"$lt": end}})
+    return conditions
+
 
 @router.get("/dashboard")
-async def admin_dashboard(moderator = Depends(get_moderator)):
-    """Get admin dashboard overview"""
+async def admin_dashboard(
+    fresh: bool = Query(False, description="Recompute now instead of serving the cached snapshot"),
+    moderator = Depends(get_moderator)
+):
+    """
+    Get admin dashboard overview. Served from a snapshot refreshed in the
+    background; `timestamp` and `age_seconds` say how old it is.
+    """
     try:
-        # Count total messages in last 24 hours
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        recent_messages = await ChatMessage.find(
-            ChatMessage.created_at >= yesterday
-        ).count()
-        
-        # Count total users
-        total_users = await User.find().count()
-        
-        # Count flagged messages
-        flagged_count = await ChatMessage.find(
-            ChatMessage.metadata != None
-        ).count()
-        
-        # Get emotional trends
-        emotions_sample = await ChatMessage.find(
-            ChatMessage.metadata != None,
-            ChatMessage.created_at >= yesterday
-        ).limit(100).to_list()
-        
-        emotion_counts = {}
-        for msg in emotions_sample:
-            if msg.metadata and 'analysis' in msg.metadata:
-                emotion = msg.metadata['analysis'].get('label', 'neutral')
-                emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-        
-        return {
-            "total_users": total_users,
-            "messages_24h": recent_messages,
-            "flagged_messages": flagged_count,
-            "emotion_trends": emotion_counts,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        return await dashboard_snapshot.get(fresh=fresh)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Dashboard error: {str(e)}")
 
 
+def _page_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    try:
+        return after_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/messages")
 async def list_messages(
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     filter_emotion: Optional[str] = Query(None),
     filter_crisis: Optional[bool] = Query(None),
     moderator = Depends(get_moderator)
 ):
-    """List messages with filtering options"""
+    """List messages with filtering options, newest first, one keyset page at a time"""
+    after = _page_cursor(cursor)
     try:
         # Build query
-        query_conditions = []
-        
-        if filter_crisis is not None:
-            if filter_crisis:
-                query_conditions.append({"metadata.crisis": True})
-            else:
-                query_conditions.append({"metadata.crisis": {"$ne": True}})
-        
-        if filter_emotion:
-            query_conditions.append({"metadata.analysis.label": filter_emotion})
+        query_conditions = _message_conditions(filter_emotion, filter_crisis)
+        if after:
+            query_conditions.append(after)
         
         # Get messages
-        if query_conditions:
-            docs = await ChatMessage.find(
-                {"$and": query_conditions}
-            ).sort(-ChatMessage.created_at).skip(offset).limit(limit).to_list()
-        else:
-            docs = await ChatMessage.find().sort(
-                -ChatMessage.created_at
-            ).skip(offset).limit(limit).to_list()
+        query = {"$and": query_conditions} if query_conditions else {}
+        docs = await ChatMessage.find(query).sort(NEWEST_FIRST).limit(limit + 1).to_list()
+        docs, next_cursor = split_page(docs, limit)
         
         messages = []
         for msg in docs:
@@ -103,7 +110,7 @@ async def list_messages(
         return {
             "messages": messages,
             "total_returned": len(messages),
-            "offset": offset,
+            "next_cursor": next_cursor,
             "limit": limit
         }
         
@@ -111,16 +118,110 @@ async def list_messages(
         raise HTTPException(status_code=500, detail=f"Messages retrieval error: {str(e)}")
 
 
+def _export_row(doc: Dict) -> Dict:
+    try:
+        content = decrypt_text(doc["content"])
+    except Exception:
+        content = "[encrypted content]"
+    metadata = doc.get("metadata") or {}
+    return {
+        "id": str(doc["_id"]),
+        "user_id": doc["user_id"],
+        "role": doc["role"],
+        "content": content,
+        "emotion": (metadata.get("analysis") or {}).get("label"),
+        "crisis": bool(metadata.get("crisis")),
+        "flagged": bool(metadata.get("flagged")),
+        "created_at": doc["created_at"].isoformat(),
+    }
+
+
+def _encode_batch(docs: List[Dict], fmt: str) -> str:
+    """Decrypts and serializes one batch; runs in a worker thread."""
+    rows = [_export_row(doc) for doc in docs]
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS).writerows(rows)
+        return buffer.getvalue()
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+async def _export_collections(start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+    """Archive months overlapping the range, oldest first, then the hot collection."""
+    hot = ChatMessage.get_motor_collection()
+    names = []
+    for name in reversed(await archive_collection_names(hot.database)):
+        if start is not None and name < archive_collection_name(start):
+            continue
+        if end is not None and name > archive_collection_name(end):
+            continue
+        names.append(name)
+    names.append(hot.name)
+    return names
+
+
+async def _stream_export(query: Dict, fmt: str, start: Optional[datetime], end: Optional[datetime]) -> AsyncIterator[str]:
+    if fmt == "csv":
+        yield ",".join(EXPORT_FIELDS) + "\r\n"
+    db = ChatMessage.get_motor_collection().database
+    projection = {"user_id": 1, "role": 1, "content": 1, "metadata": 1, "created_at": 1}
+    for name in await _export_collections(start, end):
+        cursor = db[name].find(
+            query, projection=projection,
+            sort=[("created_at", 1), ("_id", 1)], batch_size=EXPORT_BATCH_SIZE,
+        )
+        batch: List[Dict] = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield await asyncio.to_thread(_encode_batch, batch, fmt)
+                batch = []
+        if batch:
+            yield await asyncio.to_thread(_encode_batch, batch, fmt)
+
+
+@router.get("/export")
+async def export_messages(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = Query(None, description="Inclusive lower bound on created_at"),
+    end: Optional[datetime] = Query(None, description="Exclusive upper bound on created_at"),
+    filter_emotion: Optional[str] = Query(None),
+    filter_crisis: Optional[bool] = Query(None),
+    moderator = Depends(get_moderator)
+):
+    """
+    Streams decrypted messages as NDJSON or CSV, oldest first. Rows are
+    read from a cursor and decrypted a batch at a time off the event loop,
+    so memory stays flat however large the export is.
+    """
+    conditions = _message_conditions(filter_emotion, filter_crisis, start, end)
+    query = {"$and": conditions} if conditions else {}
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"kairos-messages-{datetime.utcnow():%Y%m%d-%H%M%S}.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        _stream_export(query, format, start, end),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/flagged")
-async def list_flagged(moderator = Depends(get_moderator)):
-    """List flagged or crisis messages"""
+async def list_flagged(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    moderator = Depends(get_moderator)
+):
+    """List flagged or crisis messages, newest first, one keyset page at a time"""
+    after = _page_cursor(cursor)
     try:
-        docs = await ChatMessage.find(
-            {"$or": [
-                {"metadata.crisis": True},
-                {"metadata.flagged": True}
-            ]}
-        ).sort(-ChatMessage.created_at).to_list()
+        conditions = [{"$or": [
+            {"metadata.crisis": True},
+            {"metadata.flagged": True}
+        ]}]
+        if after:
+            conditions.append(after)
+        docs = await ChatMessage.find({"$and": conditions}).sort(NEWEST_FIRST).limit(limit + 1).to_list()
+        docs, next_cursor = split_page(docs, limit)
         
         flagged_messages = []
         for msg in docs:
@@ -139,12 +240,69 @@ async def list_flagged(moderator = Depends(get_moderator)):
                 "created_at": msg.created_at
             })
         
-        return flagged_messages
+        return {
+            "messages": flagged_messages,
+            "total_returned": len(flagged_messages),
+            "next_cursor": next_cursor,
+            "limit": limit
+        }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Flagged messages error: {str(e)}")
 
 
+def _parse_types(types: Optional[str]) -> Optional[List[str]]:
+    if not types:
+        return None
+    return [t for t in (part.strip() for part in types.split(",")) if t in EVENT_TYPES]
+
+
+@router.websocket("/ws/feed")
+async def moderator_feed(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    types: Optional[str] = Query(None, description="Comma-separated: flag,crisis,message_count"),
+    user_id: Optional[str] = Query(None, description="Only events about this user"),
+):
+    """
+    Pushes flag, crisis and message_count events to a moderator as they
+    happen. The client can change its filter at any time by sending
+    {"types": [...], "user_id": ...}.
+    """
+    token, subprotocol = websocket_token(websocket, token)
+    try:
+        moderator_id = verify_token_cached(token) if token else None
+    except HTTPException:
+        moderator_id = None
+    moderator = await user_cache.get(moderator_id) if moderator_id else None
+    if not moderator or not moderator.is_moderator:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept(subprotocol=subprotocol)
+    subscription = event_bus.subscribe(_parse_types(types), user_id)
+
+    async def pump():
+        while True:
+            await websocket.send_json(await subscription.queue.get())
+
+    sender = asyncio.create_task(pump())
+    try:
+        while True:
+            data = await websocket.receive_json()
+            if "types" in data:
+                subscription.types = set(t for t in data["types"] if t in EVENT_TYPES) or set(EVENT_TYPES)
+            if "user_id" in data:
+                subscription.user_id = data["user_id"]
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Error in moderator feed for {moderator_id}: {e}")
+    finally:
+        sender.cancel()
+        event_bus.unsubscribe(subscription)
+
+
 @router.post("/flag/{message_id}")
 async def flag_message(
     message_id: str, 
@@ -168,74 +326,67 @@ async def flag_message(
         
         await msg.save()
         
+        try:
+            content = decrypt_text(msg.content)
+        except Exception:
+            content = "[encrypted content]"
+        await event_bus.emit({
+            "type": "flag",
+            "message_id": message_id,
+            "user_id": msg.user_id,
+            "content": content,
+            "reason": reason,
+        })
+        
         return {"success": True, "message": "Message flagged successfully"}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Flag message error: {str(e)}")
 
 
+class BulkAnalysisRequest(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, max_length=500)
+
+
 @router.post("/analyze-conversation/{user_id}")
 async def analyze_user_conversation(
     user_id: str,
     moderator = Depends(get_moderator)
 ):
-    """Analyze a user's conversation for insights"""
+    """
+    Analyze a user's recent conversation for insights. Results are cached
+    until the user sends another message.
+    """
     try:
-        # Get user's messages
-        messages = await ChatMessage.find(
-            ChatMessage.user_id == user_id
-        ).sort(ChatMessage.created_at).limit(50).to_list()
-        
-        if not messages:
-            raise HTTPException(status_code=404, detail="No messages found for user")
-        
-        # Decrypt and analyze
-        conversation_text = []
-        emotions_found = []
-        crisis_indicators = []
-        
-        for msg in messages:
-            try:
-                content = decrypt_text(msg.content)
-                conversation_text.append(f"{msg.role}: {content}")
-                
-                if msg.metadata:
-                    if msg.metadata.get("crisis"):
-                        crisis_indicators.append({
-                            "message": content,
-                            "timestamp": msg.created_at.isoformat()
-                        })
-                    
-                    if "analysis" in msg.metadata:
-                        emotion = msg.metadata["analysis"].get("label")
-                        if emotion:
-                            emotions_found.append(emotion)
-            except Exception:
-                continue
-        
-        # Generate summary using AI service
-        conversation_summary = "\n".join(conversation_text[-10:])  # Last 10 messages
-        
-        # Use Groq to analyze patterns
-        analysis_result = ai_service.analyze_emotion(conversation_summary)
-        
-        # Count emotions
-        emotion_counts = {}
-        for emotion in emotions_found:
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-        
-        return {
-            "user_id": user_id,
-            "total_messages": len(messages),
-            "emotion_distribution": emotion_counts,
-            "crisis_indicators": crisis_indicators,
-            "overall_sentiment": analysis_result,
-            "requires_attention": len(crisis_indicators) > 0 or analysis_result.get("label") in ["sadness", "fear", "anger"],
-            "analysis_timestamp": datetime.utcnow().isoformat()
-        }
-        
+        result = await conversation_analyzer.analyze(user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Conversation analysis error: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=404, detail="No messages found for user")
+    return result
+
+
+@router.post("/analyze-conversations", status_code=202)
+async def analyze_conversations_bulk(
+    request: BulkAnalysisRequest,
+    moderator = Depends(get_moderator)
+):
+    """Start a background job analyzing many users; poll its progress with the job id."""
+    job = conversation_analyzer.start_job(request.user_ids)
+    return {"job_id": job["job_id"], "total": job["total"], "status": job["status"]}
+
+
+@router.get("/analysis-jobs/{job_id}")
+async def analysis_job_status(
+    job_id: str,
+    include_results: bool = Query(True),
+    moderator = Depends(get_moderator)
+):
+    """Progress of a bulk analysis job, with the results gathered so far"""
+    job = conversation_analyzer.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    return job if include_results else {k: v for k, v in job.items() if k != "results"}
 
 
 @router.get("/emotions-report")
@@ -367,12 +518,14 @@ async def generate_wellness_insights(moderator = Depends(get_moderator)):
 @router.get("/users")
 async def list_users(
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     moderator = Depends(get_moderator)
 ):
-    """List users with basic stats"""
+    """List users with basic stats, newest first, one keyset page at a time"""
+    after = _page_cursor(cursor)
     try:
-        users = await User.find().skip(offset).limit(limit).to_list()
+        users = await User.find(after or {}).sort(NEWEST_FIRST).limit(limit + 1).to_list()
+        users, next_cursor = split_page(users, limit)
         
         user_stats = []
         for user in users:
@@ -400,7 +553,7 @@ async def list_users(
         return {
             "users": user_stats,
             "total_returned": len(user_stats),
-            "offset": offset,
+            "next_cursor": next_cursor,
             "limit": limit
         }
         
@@ -2,15 +2,15 @@ from datetime import timedelta
 from fastapi import APIRouter, HTTPException, status, Depends, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
-from passlib.context import CryptContext
 from starlette.responses import RedirectResponse
 
 from db.models import User
 from core.security import create_access_token
-from core.oauth import oauth
+from core.passwords import hash_password, verify_password, check_login_throttle
+from core.oauth import get_oauth
+from core.user_cache import user_cache
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
 class RegisterReq(BaseModel):
     username: str | None = None
@@ -31,7 +31,7 @@ async def register(payload: RegisterReq):
         existing = await User.find_one({"username": payload.username})
         if existing:
             raise HTTPException(status_code=400, detail="Username already exists")
-    hashed_password = pwd_context.hash(payload.password) if payload.password else None
+    hashed_password = await hash_password(payload.password) if payload.password else None
     user = User(
         username=payload.username,
         is_anonymous=payload.anonymous,
@@ -43,16 +43,25 @@ async def register(payload: RegisterReq):
     return {"access_token": token, "token_type": "bearer", "user_id": str(user.id)}
 
 @router.post("/token", response_model=TokenResp)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    # This endpoint remains the same
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    # Throttle before any DB or argon2 work so a login storm stays cheap
+    check_login_throttle(form_data.username, request.client.host if request.client else None)
     user = await User.find_one({"username": form_data.username})
     if not user or not user.hashed_password:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     try:
-        if not pwd_context.verify(form_data.password, user.hashed_password):
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+        valid, new_hash = await verify_password(form_data.password, user.hashed_password)
+    except HTTPException:
+        raise
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # Hash parameters changed since this password was stored; upgrade it
+        user.hashed_password = new_hash
+        await user.save()
+        await user_cache.invalidate(str(user.id))
     token = create_access_token(subject=str(user.id), expires_delta=timedelta(days=30))
     return {"access_token": token, "token_type": "bearer", "user_id": str(user.id)}
 
@@ -69,6 +78,7 @@ async def get_or_create_google_user(user_info: dict) -> User:
         # Update their picture in case it has changed since their last login.
         user.profile_picture_url = user_info.get('picture')
         await user.save()
+        await user_cache.invalidate(str(user.id))
         return user
 
     # Case 2: User has a local account with the same email. Link it to Google.
@@ -78,6 +88,7 @@ async def get_or_create_google_user(user_info: dict) -> User:
         user.provider = "google"
         user.profile_picture_url = user_info.get('picture') # <-- Add picture
         await user.save()
+        await user_cache.invalidate(str(user.id))
         return user
 
     # Case 3: This is a brand new user.
@@ -96,13 +107,13 @@ async def get_or_create_google_user(user_info: dict) -> User:
 async def google_login(request: Request):
     # This endpoint remains the same
     redirect_uri = request.url_for('google_auth_callback')
-    return await oauth.google.authorize_redirect(request, str(redirect_uri))
+    return await get_oauth().google.authorize_redirect(request, str(redirect_uri))
 
 @router.get('/google/auth')
 async def google_auth_callback(request: Request):
     # This endpoint remains the same
     try:
-        token_data = await oauth.google.authorize_access_token(request)
+        token_data = await get_oauth().google.authorize_access_token(request)
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Could not validate Google credentials: {e}")
 
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException, Query, status
+import asyncio
+from typing import List, Optional
 from pydantic import BaseModel
 
+from api.deps import get_current_user_id, websocket_token
+from core.security import verify_token_cached
 from core.websocket_manager import manager
 from services import chat_service
 from db.models import ChatMessage
+from utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/api/chat", tags=["Chat"])
 
@@ -12,16 +16,32 @@ class ChatMessageResponse(BaseModel):
     """A Pydantic model to define the shape of a chat message response."""
     role: str
     content: str
+    # Pass the first (oldest) message's cursor back to load older messages
+    cursor: str
 
 # --- REVERTED: A single endpoint to get all messages for a user ---
 @router.get("/history/{user_id}", response_model=List[ChatMessageResponse])
-async def get_chat_history(user_id: str):
-    """Gets the decrypted chat history for a specific user."""
+async def get_chat_history(
+    user_id: str,
+    cursor: Optional[str] = Query(None, description="cursor of the oldest message already loaded"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; omit for the full history"),
+    token_user_id: str = Depends(get_current_user_id),
+):
+    """Gets the decrypted chat history for a specific user, optionally one page at a time."""
+    if token_user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed to read this chat history.")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         # Call the simplified service function
-        messages = await chat_service.get_user_chat_history(user_id)
+        messages = await chat_service.get_user_chat_history(user_id, after=after, limit=limit)
         # Convert the database objects to the response model format
-        return [{"role": msg.role, "content": msg.content} for msg in messages]
+        return [
+            {"role": msg.role, "content": msg.content, "cursor": encode_cursor(msg.created_at, msg.id)}
+            for msg in messages
+        ]
     except Exception as e:
         print(f"Error fetching history for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail="Could not retrieve chat history.")
@@ -29,9 +49,21 @@ async def get_chat_history(user_id: str):
 
 # --- REVERTED: A simplified WebSocket endpoint ---
 @router.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: str):
+async def websocket_endpoint(websocket: WebSocket, user_id: str, token: Optional[str] = Query(None)):
     """Handles the real-time WebSocket connection for a user."""
-    await manager.connect(websocket, user_id)
+    # Authenticate from the JWT signature alone (cached) and reject before
+    # accept(), so unauthenticated clients never take a connection slot.
+    token, subprotocol = websocket_token(websocket, token)
+    try:
+        token_user_id = verify_token_cached(token) if token else None
+    except HTTPException:
+        token_user_id = None
+    if token_user_id != user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await manager.connect(websocket, user_id, subprotocol)
+    turns = set()
     try:
         while True:
             # It now only expects a simple message, not a conversation_id
@@ -39,8 +71,11 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             user_message = data.get("message")
 
             if user_message:
-                # Call the simplified service function
-                await chat_service.process_user_message(user_id, user_message)
+                # Run the turn as a task so the socket keeps reading; admission
+                # control in chat_service queues or refuses extra turns.
+                task = asyncio.create_task(chat_service.process_user_message(user_id, user_message))
+                turns.add(task)
+                task.add_done_callback(turns.discard)
 
     except WebSocketDisconnect:
         manager.disconnect(user_id)
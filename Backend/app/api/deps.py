@@ -1,17 +1,40 @@
-from fastapi import Depends, HTTPException, status
-from core.security import oauth2_scheme, verify_token
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, WebSocket, status
+from core.security import oauth2_scheme, verify_token_cached
+from core.user_cache import user_cache
 from db.models import User
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
-    user_id = verify_token(token)
-    user = await User.get(user_id)
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
+    """
+    Fast path for handlers that only need the id: no database lookup. Async so
+    FastAPI runs it on the event loop instead of hopping to its threadpool.
+    """
+    return verify_token_cached(token)
+
+
+def websocket_token(websocket: WebSocket, token: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Returns (token, subprotocol to echo). Browsers cannot set headers on a
+    WebSocket, so the token comes either as ?token= or as the subprotocol
+    pair ["bearer", "<jwt>"].
+    """
+    if token:
+        return token, None
+    protocols = websocket.scope.get("subprotocols") or []
+    if len(protocols) == 2 and protocols[0] == "bearer":
+        return protocols[1], "bearer"
+    return None, None
+
+
+async def get_current_user(user_id: str = Depends(get_current_user_id)) -> User:
+    user = await user_cache.get(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
 async def get_moderator(user: User = Depends(get_current_user)) -> User:
-    # For now, allow any authenticated user to access admin functions
-    # In production, you'd check user.is_moderator or similar field
+    if not user.is_moderator:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Moderator access required")
     return user
\ No newline at end of file
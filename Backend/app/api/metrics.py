@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from core.metrics import render_latest
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
@@ -1,5 +1,8 @@
+import os
+from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
+from typing import Optional
 
 class Settings(BaseSettings):
     # --- Existing Settings ---
@@ -8,12 +11,109 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = Field(60 * 24 * 7, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
     mongodb_url: str = Field("mongodb://localhost:27017", alias="MONGODB_URL")
     mongodb_db: str = Field("mental_wellness", alias="MONGODB_DB")
+
+    # MongoDB connection pool (one shared client per process)
+    mongodb_max_pool_size: int = Field(100, alias="MONGODB_MAX_POOL_SIZE")
+    mongodb_min_pool_size: int = Field(0, alias="MONGODB_MIN_POOL_SIZE")
+    mongodb_max_idle_time_ms: int = Field(60_000, alias="MONGODB_MAX_IDLE_TIME_MS")
+    mongodb_connect_timeout_ms: int = Field(5_000, alias="MONGODB_CONNECT_TIMEOUT_MS")
+    mongodb_server_selection_timeout_ms: int = Field(5_000, alias="MONGODB_SERVER_SELECTION_TIMEOUT_MS")
+    mongodb_socket_timeout_ms: int = Field(20_000, alias="MONGODB_SOCKET_TIMEOUT_MS")
+    mongodb_read_preference: str = Field("primary", alias="MONGODB_READ_PREFERENCE")
+    # Comma-separated, in preference order, e.g. "zstd,snappy,zlib".
+    # zstd needs the `zstandard` package and snappy needs `python-snappy`.
+    mongodb_compressors: str = Field("", alias="MONGODB_COMPRESSORS")
     redis_url: str = Field("redis://localhost:6379/0", alias="REDIS_URL")
     fernet_key: str = Field(..., alias="FERNET_KEY")
     
     # Groq API Configuration
     groq_api_key: str = Field(..., alias="GROQ_API_KEY")
     groq_model: str = Field("mixtral-8x7b-32768", alias="GROQ_MODEL")
+    # Override for OpenAI-compatible stand-ins, e.g. benchmarks/fake_groq.py
+    groq_base_url: Optional[str] = Field(None, alias="GROQ_BASE_URL")
+
+    # Password hashing (argon2). Defaults match passlib's, which existing
+    # hashes were made with. Raising the costs upgrades hashes on the next
+    # successful login; lowering them never downgrades a stored hash.
+    argon2_time_cost: int = Field(3, alias="ARGON2_TIME_COST")
+    argon2_memory_cost: int = Field(65_536, alias="ARGON2_MEMORY_COST")  # KiB
+    argon2_parallelism: int = Field(4, alias="ARGON2_PARALLELISM")
+    password_hash_workers: int = Field(2, alias="PASSWORD_HASH_WORKERS")
+    password_hash_queue_limit: int = Field(32, alias="PASSWORD_HASH_QUEUE_LIMIT")
+    login_attempts_per_username: int = Field(5, alias="LOGIN_ATTEMPTS_PER_USERNAME")
+    login_attempts_per_ip: int = Field(20, alias="LOGIN_ATTEMPTS_PER_IP")
+    login_throttle_window_seconds: int = Field(60, alias="LOGIN_THROTTLE_WINDOW_SECONDS")
+
+    # Authenticated-user cache used by get_current_user
+    user_cache_ttl_seconds: int = Field(30, alias="USER_CACHE_TTL_SECONDS")
+    user_cache_max_size: int = Field(10_000, alias="USER_CACHE_MAX_SIZE")
+    user_cache_redis_enabled: bool = Field(False, alias="USER_CACHE_REDIS_ENABLED")
+
+    # Write-behind message persistence (batched insert_many off the reply path).
+    # Durable mode still waits for the batch ack before the reply is sent.
+    write_behind_enabled: bool = Field(False, alias="WRITE_BEHIND_ENABLED")
+    write_behind_durable: bool = Field(True, alias="WRITE_BEHIND_DURABLE")
+    write_behind_flush_ms: int = Field(5, alias="WRITE_BEHIND_FLUSH_MS")
+    write_behind_batch_size: int = Field(100, alias="WRITE_BEHIND_BATCH_SIZE")
+    write_behind_queue_size: int = Field(10_000, alias="WRITE_BEHIND_QUEUE_SIZE")
+
+    # Compact chat storage: BinData ciphertext, zstd for long messages.
+    # Reads always accept both formats; this only changes what new writes use.
+    compact_messages_enabled: bool = Field(False, alias="COMPACT_MESSAGES_ENABLED")
+    message_compression_enabled: bool = Field(True, alias="MESSAGE_COMPRESSION_ENABLED")
+    message_compression_min_bytes: int = Field(256, alias="MESSAGE_COMPRESSION_MIN_BYTES")
+    message_compression_level: int = Field(3, alias="MESSAGE_COMPRESSION_LEVEL")
+
+    # Messages older than this move to monthly archive collections
+    chat_archive_after_days: int = Field(90, alias="CHAT_ARCHIVE_AFTER_DAYS")
+
+    # Chat storage model: "documents" (one doc per message), "dual" (documents
+    # plus buckets, for migrating) or "buckets" (per-user bucket documents).
+    # The admin API (messages, flagging, dashboard, export, live feed,
+    # conversation analysis) reads chat_messages only: in "buckets" mode it
+    # sees crisis messages, which are also written there, and nothing else.
+    chat_storage_model: str = Field("documents", alias="CHAT_STORAGE_MODEL")
+    chat_bucket_size: int = Field(100, alias="CHAT_BUCKET_SIZE")
+
+    # Moderator live feed: "local", "redis" or "change_stream" (see core/event_bus.py)
+    moderator_events_source: str = Field("local", alias="MODERATOR_EVENTS_SOURCE")
+    moderator_feed_queue_size: int = Field(1000, alias="MODERATOR_FEED_QUEUE_SIZE")
+    moderator_count_interval_seconds: float = Field(5.0, alias="MODERATOR_COUNT_INTERVAL_SECONDS")
+
+    # Admin dashboard snapshot, refreshed when a request finds it this old
+    dashboard_refresh_seconds: float = Field(60.0, alias="DASHBOARD_REFRESH_SECONDS")
+    dashboard_cache_redis_enabled: bool = Field(False, alias="DASHBOARD_CACHE_REDIS_ENABLED")
+
+    # Moderator conversation analysis cache and bulk jobs
+    analysis_cache_max_size: int = Field(5000, alias="ANALYSIS_CACHE_MAX_SIZE")
+    analysis_cache_ttl_seconds: int = Field(86400, alias="ANALYSIS_CACHE_TTL_SECONDS")
+    analysis_cache_redis_enabled: bool = Field(False, alias="ANALYSIS_CACHE_REDIS_ENABLED")
+    analysis_bulk_concurrency: int = Field(4, alias="ANALYSIS_BULK_CONCURRENCY")
+    analysis_max_jobs: int = Field(100, alias="ANALYSIS_MAX_JOBS")
+
+    # Admission control for chat turns (see services/admission.py)
+    chat_max_inflight_per_user: int = Field(1, alias="CHAT_MAX_INFLIGHT_PER_USER")
+    chat_max_queued_per_user: int = Field(2, alias="CHAT_MAX_QUEUED_PER_USER")
+    llm_max_concurrency: int = Field(16, alias="LLM_MAX_CONCURRENCY")
+    llm_queue_timeout_ms: int = Field(2000, alias="LLM_QUEUE_TIMEOUT_MS")
+    llm_timeout_ms: int = Field(20000, alias="LLM_TIMEOUT_MS")
+    # Reserved lane for turns with crisis language
+    crisis_llm_max_concurrency: int = Field(4, alias="CRISIS_LLM_MAX_CONCURRENCY")
+    crisis_max_inflight_per_user: int = Field(1, alias="CRISIS_MAX_INFLIGHT_PER_USER")
+    crisis_llm_queue_timeout_ms: int = Field(1000, alias="CRISIS_LLM_QUEUE_TIMEOUT_MS")
+    crisis_llm_timeout_ms: int = Field(8000, alias="CRISIS_LLM_TIMEOUT_MS")
+
+    # Per-turn tracing (OpenTelemetry). Exporter: "none", "console" or "file"
+    tracing_exporter: str = Field("none", alias="TRACING_EXPORTER")
+    tracing_file: str = Field("traces.jsonl", alias="TRACING_FILE")
+    tracing_sample_ratio: float = Field(1.0, alias="TRACING_SAMPLE_RATIO")
+    slow_turn_threshold_ms: int = Field(3_000, alias="SLOW_TURN_THRESHOLD_MS")
+    slow_turn_log_sample_rate: float = Field(1.0, alias="SLOW_TURN_LOG_SAMPLE_RATE")
+
+    # Event loop lag monitor; debug mode also dumps stacks of blocking calls
+    loop_monitor_interval_ms: int = Field(250, alias="LOOP_MONITOR_INTERVAL_MS")
+    loop_block_threshold_ms: int = Field(100, alias="LOOP_BLOCK_THRESHOLD_MS")
+    loop_monitor_debug: bool = Field(False, alias="LOOP_MONITOR_DEBUG")
 
     # --- New Google OAuth Settings ---
     google_client_id: str = Field(..., alias="GOOGLE_CLIENT_ID")
@@ -27,4 +127,34 @@ class Settings(BaseSettings):
         case_sensitive=False,   # allow uppercase in .env
     )
 
-settings = Settings()
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Reads the environment / .env once, on first use. ENV_FILE points at a
+    different .env, for scripts that do not run from the app directory.
+    """
+    return Settings(_env_file=os.environ.get("ENV_FILE", ".env"))
+
+
+class _LazySettings:
+    """Module-level handle that defers Settings() until an attribute is read."""
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+
+settings = _LazySettings()
+
+
+class _LazySecretKey:
+    """
+    SECRET_KEY for APIs that call str() on their key only when first used,
+    such as SessionMiddleware when the middleware stack is built.
+    """
+
+    def __str__(self):
+        return get_settings().secret_key
+
+
+lazy_secret_key = _LazySecretKey()
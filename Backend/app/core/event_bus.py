@@ -0,0 +1,183 @@
+"""
+Moderator event bus.
+
+Events are plain dicts with a "type": "flag", "crisis" or
+"message_count". Each moderator WebSocket subscribes with its own filter
+and gets a bounded queue. A slow client loses its oldest events and
+never blocks publishers.
+
+MODERATOR_EVENTS_SOURCE picks where events come from:
+  local          emit() fans out in this process (single node)
+  redis          emit() publishes to a Redis channel that every node listens to
+  change_stream  a MongoDB change stream on chat_messages produces the events
+                 and emit() is a no-op (needs a replica set)
+"""
+
+import asyncio
+import json
+import time
+from typing import Dict, Iterable, Optional, Set
+from core.config import settings
+
+REDIS_CHANNEL = "kairos:moderator-events"
+EVENT_TYPES = ("flag", "crisis", "message_count")
+
+
+class Subscription:
+    def __init__(self, types: Optional[Iterable[str]] = None, user_id: Optional[str] = None):
+        self.types: Set[str] = set(types) if types else set(EVENT_TYPES)
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.moderator_feed_queue_size)
+
+    def wants(self, event: Dict) -> bool:
+        if event["type"] not in self.types:
+            return False
+        return self.user_id is None or event.get("user_id") in (None, self.user_id)
+
+    def offer(self, event: Dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class EventBus:
+    def __init__(self):
+        self._subscribers: Set[Subscription] = set()
+        self._tasks = []
+        self._redis = None
+        self._message_count = 0
+
+    @property
+    def source(self) -> str:
+        return settings.moderator_events_source
+
+    def subscribe(self, types: Optional[Iterable[str]] = None, user_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(types, user_id)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def _dispatch(self, event: Dict):
+        for subscription in self._subscribers:
+            if subscription.wants(event):
+                subscription.offer(event)
+
+    async def emit(self, event: Dict):
+        """Publishes an event from application code."""
+        event.setdefault("at", time.time())
+        if self.source == "redis":
+            try:
+                await self._redis_client().publish(REDIS_CHANNEL, json.dumps(event, default=str))
+            except Exception as e:
+                print(f"⚠️ Moderator event publish failed: {e}")
+        elif self.source == "local":
+            self._dispatch(event)
+
+    def count_message(self):
+        """Counts a new chat message; totals go out as periodic message_count events."""
+        if self.source != "change_stream":
+            self._message_count += 1
+
+    def _redis_client(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(settings.redis_url)
+        return self._redis
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._tasks.append(loop.create_task(self._count_ticker()))
+        if self.source == "redis":
+            self._tasks.append(loop.create_task(self._redis_listener()))
+        elif self.source == "change_stream":
+            self._tasks.append(loop.create_task(self._change_stream_listener()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def _count_ticker(self):
+        interval = settings.moderator_count_interval_seconds
+        while True:
+            await asyncio.sleep(interval)
+            count, self._message_count = self._message_count, 0
+            if count:
+                event = {"type": "message_count", "count": count, "window_seconds": interval}
+                if self.source == "change_stream":
+                    self._dispatch({**event, "at": time.time()})
+                else:
+                    await self.emit(event)
+
+    async def _redis_listener(self):
+        while True:
+            try:
+                pubsub = self._redis_client().pubsub()
+                await pubsub.subscribe(REDIS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._dispatch(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Moderator event listener error, retrying: {e}")
+                await asyncio.sleep(1)
+
+    async def _change_stream_listener(self):
+        from db.models import ChatMessage
+        from utils.encryption import decrypt_text
+
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update"]}}}]
+        resume_token = None
+        while True:
+            try:
+                collection = ChatMessage.get_motor_collection()
+                async with collection.watch(
+                    pipeline, full_document="updateLookup", resume_after=resume_token,
+                ) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        doc = change.get("fullDocument")
+                        if not doc:
+                            continue
+                        metadata = doc.get("metadata") or {}
+                        if change["operationType"] == "insert":
+                            self._message_count += 1
+                            kind = "crisis" if metadata.get("crisis") else None
+                        else:
+                            updated = change.get("updateDescription", {}).get("updatedFields", {})
+                            touched = any(k == "metadata" or k.startswith("metadata.flagged") for k in updated)
+                            kind = "flag" if touched and metadata.get("flagged") else None
+                        if kind is None:
+                            continue
+                        try:
+                            content = await asyncio.to_thread(decrypt_text, doc["content"])
+                        except Exception:
+                            content = "[encrypted content]"
+                        self._dispatch({
+                            "type": kind,
+                            "message_id": str(doc["_id"]),
+                            "user_id": doc["user_id"],
+                            "content": content,
+                            "reason": metadata.get("flagged_reason"),
+                            "at": time.time(),
+                        })
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Change stream error, resuming: {e}")
+                await asyncio.sleep(1)
+
+
+event_bus = EventBus()
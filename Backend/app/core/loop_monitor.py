@@ -0,0 +1,114 @@
+"""
+Event-loop lag monitor.
+
+A background task sleeps for a fixed interval and records how late it
+wakes up; that delay is time the loop spent running something else. In
+debug mode a watchdog thread also samples the loop thread's stack when
+the loop has not ticked for longer than the threshold, and attributes the
+stall to the innermost frame in our own code.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Optional
+from prometheus_client import Counter, Gauge, Histogram
+from core.config import settings
+
+
+EVENT_LOOP_LAG = Histogram(
+    "kairos_event_loop_lag_seconds",
+    "How late the loop monitor woke up versus its schedule",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_LAG_LAST = Gauge(
+    "kairos_event_loop_lag_last_seconds",
+    "Most recent event loop lag sample",
+    multiprocess_mode="max",
+)
+BLOCKING_CALLS = Counter(
+    "kairos_event_loop_blocking_calls_total",
+    "Loop stalls over the threshold, by the module that was running (debug mode)",
+    ["module"],
+)
+
+APP_DIR = str(Path(__file__).resolve().parents[1])
+
+
+def _attribute(frame) -> str:
+    """Module of the innermost frame inside the app, else of the innermost frame."""
+    innermost = frame
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(APP_DIR):
+            return frame.f_globals.get("__name__", "?")
+        frame = frame.f_back
+    return innermost.f_globals.get("__name__", "?") if innermost else "?"
+
+
+class LoopMonitor:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_tick = 0.0
+        self._loop_thread_id: Optional[int] = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        # Measure from now, not from import, so slow startup isn't a stall
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = loop.create_task(self._measure())
+        if settings.loop_monitor_debug:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        interval = settings.loop_monitor_interval_ms / 1000
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - start - interval)
+            self._last_tick = time.monotonic()
+            EVENT_LOOP_LAG.observe(lag)
+            EVENT_LOOP_LAG_LAST.set(lag)
+
+    def _watch(self):
+        """Watchdog thread: dumps the loop thread's stack once per stall."""
+        interval = settings.loop_monitor_interval_ms / 1000
+        threshold = settings.loop_block_threshold_ms / 1000
+        reported_tick = None
+        while not self._stop.wait(threshold / 2):
+            tick = self._last_tick
+            stalled_for = time.monotonic() - tick - interval
+            if stalled_for < threshold or tick == reported_tick:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            reported_tick = tick
+            module = _attribute(frame)
+            BLOCKING_CALLS.labels(module).inc()
+            stack = "".join(traceback.format_stack(frame, limit=15))
+            print(f"--- EVENT LOOP BLOCKED {stalled_for * 1000:.0f}ms in {module} ---\n{stack}")
+
+
+loop_monitor = LoopMonitor()
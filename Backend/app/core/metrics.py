@@ -0,0 +1,128 @@
+"""
+Prometheus metrics for the chat hot path, served at /metrics.
+
+Set PROMETHEUS_MULTIPROC_DIR when running several uvicorn workers so the
+endpoint aggregates all of them.
+"""
+
+import os
+from typing import Dict
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from pymongo import monitoring
+
+
+# Buckets span fast local work (sub-millisecond) up to slow LLM calls
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0)
+
+LLM_LATENCY = Histogram(
+    "kairos_llm_request_seconds",
+    "Latency of LLM calls, per AIService method",
+    ["method"],
+    buckets=SLOW_BUCKETS,
+)
+FALLBACK_RESPONSES = Counter(
+    "kairos_fallback_responses_total",
+    "Replies served from canned fallbacks instead of the LLM",
+    ["method", "reason"],
+)
+DB_LATENCY = Histogram(
+    "kairos_db_operation_seconds",
+    "MongoDB command latency per collection and operation",
+    ["collection", "operation"],
+    buckets=FAST_BUCKETS,
+)
+CRYPTO_LATENCY = Histogram(
+    "kairos_crypto_seconds",
+    "Fernet encrypt/decrypt time per message",
+    ["operation"],
+    buckets=FAST_BUCKETS,
+)
+WS_SEND_LATENCY = Histogram(
+    "kairos_websocket_send_seconds",
+    "Time to hand one frame to a client WebSocket",
+    buckets=FAST_BUCKETS,
+)
+WS_SENDS_IN_PROGRESS = Gauge(
+    "kairos_websocket_sends_in_progress",
+    "WebSocket sends awaiting the transport (send queue depth)",
+    multiprocess_mode="livesum",
+)
+WRITE_BEHIND_QUEUE_DEPTH = Gauge(
+    "kairos_write_behind_queue_depth",
+    "Chat messages waiting in the write-behind buffer",
+    multiprocess_mode="livesum",
+)
+WRITE_BEHIND_BATCH_SIZE = Histogram(
+    "kairos_write_behind_batch_size",
+    "Documents per write-behind insert_many",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+ADMISSION_REJECTED = Counter(
+    "kairos_admission_rejected_total",
+    "Chat turns refused (user_limit), shed (shed) or timed out (timeout), per lane",
+    ["reason", "lane"],
+)
+LLM_QUEUE_WAIT = Histogram(
+    "kairos_llm_queue_wait_seconds",
+    "Time a chat turn waited for an LLM slot, per lane",
+    ["lane"],
+    buckets=FAST_BUCKETS + (2.5, 5.0),
+)
+LLM_INFLIGHT = Gauge(
+    "kairos_llm_inflight",
+    "Chat turns currently holding an LLM slot, per lane",
+    ["lane"],
+    multiprocess_mode="livesum",
+)
+CHAT_TURN_LATENCY = Histogram(
+    "kairos_chat_turn_seconds",
+    "Time from admitting a chat turn to sending its reply, per lane",
+    ["lane"],
+    buckets=SLOW_BUCKETS,
+)
+ACTIVE_CONNECTIONS = Gauge(
+    "kairos_websocket_active_connections",
+    "Open chat WebSocket connections",
+    multiprocess_mode="livesum",
+)
+
+
+class CommandLatencyListener(monitoring.CommandListener):
+    """Feeds every MongoDB command's duration into DB_LATENCY."""
+
+    def __init__(self):
+        # request_id -> collection, filled on start and drained on completion
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else "-"
+
+    def _observe(self, event):
+        collection = self._collections.pop(event.request_id, "-")
+        DB_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._observe(event)
+
+    def failed(self, event):
+        self._observe(event)
+
+
+def render_latest():
+    """Returns (body, content type) for the /metrics endpoint."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,135 @@
+import asyncio
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Deque, Dict, Optional, Tuple
+from fastapi import HTTPException, status
+from core.config import settings
+
+
+@lru_cache
+def get_pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__rounds=settings.argon2_time_cost,
+        argon2__memory_cost=settings.argon2_memory_cost,
+        argon2__parallelism=settings.argon2_parallelism,
+    )
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+# Hash/verify calls queued or running; bounded so a login storm fails fast
+_in_flight = 0
+
+
+# argon2-cffi releases the GIL while hashing, so a small thread pool keeps
+# the CPU work off the event loop without the cost of a process pool.
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.password_hash_workers,
+            thread_name_prefix="argon2",
+        )
+    return _executor
+
+
+async def _run_bounded(func, *args):
+    global _in_flight
+    if _in_flight >= settings.password_hash_queue_limit:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in requests, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    _in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+    finally:
+        _in_flight -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run_bounded(get_pwd_context().hash, password)
+
+
+_ARGON2_PARAMS = re.compile(r"\$m=(\d+),t=(\d+),p=(\d+)\$")
+
+
+def _argon2_costs(hashed: str) -> Optional[Tuple[int, int]]:
+    """(memory_cost, time_cost) of an argon2 hash, or None if unparseable."""
+    match = _ARGON2_PARAMS.search(hashed)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _is_upgrade(old_hash: str, new_hash: str) -> bool:
+    old, new = _argon2_costs(old_hash), _argon2_costs(new_hash)
+    if old is None:
+        # Not an argon2 hash we can read (e.g. another scheme): migrate it
+        return True
+    return new is not None and new[0] >= old[0] and new[1] >= old[1]
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Returns (is_valid, new_hash). new_hash is set when the stored hash uses
+    weaker parameters than configured and should be saved in its place; a
+    stored hash stronger than the configuration is kept as it is.
+    """
+    valid, new_hash = await _run_bounded(get_pwd_context().verify_and_update, password, hashed)
+    if new_hash and not _is_upgrade(hashed, new_hash):
+        new_hash = None
+    return valid, new_hash
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class LoginThrottle:
+    """Sliding-window attempt counter per key (username or client IP)."""
+
+    def __init__(self, limit_setting: str):
+        # Limits are read from settings on use so importing stays cheap
+        self.limit_setting = limit_setting
+        self.attempts: Dict[str, Deque[float]] = {}
+
+    def hit(self, key: str) -> bool:
+        """Records an attempt; returns False when the key is over its limit."""
+        now = time.monotonic()
+        window = settings.login_throttle_window_seconds
+        bucket = self.attempts.setdefault(key, deque())
+        while bucket and bucket[0] <= now - window:
+            bucket.popleft()
+        if len(bucket) >= getattr(settings, self.limit_setting):
+            return False
+        bucket.append(now)
+        # Drop idle keys now and then so the dict does not grow forever
+        if len(self.attempts) > 10_000:
+            self.attempts = {k: v for k, v in self.attempts.items() if v and v[-1] > now - window}
+        return True
+
+
+username_throttle = LoginThrottle("login_attempts_per_username")
+ip_throttle = LoginThrottle("login_attempts_per_ip")
+
+
+def check_login_throttle(username: str, client_ip: Optional[str]):
+    """Raises 429 when the username or client IP has too many recent attempts."""
+    allowed = ip_throttle.hit(client_ip) if client_ip else True
+    allowed = username_throttle.hit(username.lower()) and allowed
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(settings.login_throttle_window_seconds)},
+        )
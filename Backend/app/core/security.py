@@ -1,5 +1,8 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt, JWTError
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
@@ -28,3 +31,38 @@ def verify_token(token: str) -> str:
         return sub
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+
+
+# Tokens whose signature has already been checked, mapped to (subject, exp).
+# A hit skips the HMAC verification and JSON decoding entirely.
+_VERIFIED_TOKEN_CACHE_SIZE = 10_000
+_verified_tokens: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+# Callers are normally on the event loop, but sync code may run in threads
+_verified_tokens_lock = threading.Lock()
+
+
+def verify_token_cached(token: str) -> str:
+    """verify_token() with a cache of already-verified tokens, honouring exp."""
+    now = time.time()
+    with _verified_tokens_lock:
+        cached = _verified_tokens.get(token)
+        if cached is not None:
+            sub, exp = cached
+            if exp > now:
+                _verified_tokens.move_to_end(token)
+                return sub
+            del _verified_tokens[token]
+
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    sub = payload.get("sub")
+    if sub is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token missing subject")
+
+    with _verified_tokens_lock:
+        _verified_tokens[token] = (str(sub), float(payload.get("exp", now)))
+        if len(_verified_tokens) > _VERIFIED_TOKEN_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+    return str(sub)
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+OpenTelemetry tracing for chat turns.
+
+setup_tracing() is called from the FastAPI lifespan. Until then (tests,
+CLI tools) the OpenTelemetry API hands out no-op spans and trace ids are
+None.
+"""
+
+import json
+import random
+from typing import Dict, List, Optional
+from opentelemetry import trace
+from opentelemetry.sdk.trace import SpanProcessor
+from core.config import settings
+
+
+TURN_SPAN = "chat.turn"
+
+tracer = trace.get_tracer("kairos.chat")
+
+
+def current_trace_id() -> Optional[str]:
+    """Hex trace id of the active span, or None when tracing is off."""
+    context = trace.get_current_span().get_span_context()
+    if not context.is_valid:
+        return None
+    return format(context.trace_id, "032x")
+
+
+def setup_tracing():
+    """Installs the SDK tracer provider with the configured exporter."""
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "kairos-backend"}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+    )
+    if settings.tracing_exporter == "console":
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    elif settings.tracing_exporter == "file":
+        out = open(settings.tracing_file, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    provider.add_span_processor(SlowTurnLogger())
+    trace.set_tracer_provider(provider)
+
+
+def shutdown_tracing():
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+class SlowTurnLogger(SpanProcessor):
+    """
+    Span processor that prints a one-line stage breakdown for chat turns
+    slower than settings.slow_turn_threshold_ms, sampled at
+    settings.slow_turn_log_sample_rate.
+    """
+
+    def __init__(self):
+        # trace id -> [(stage, ms)] for turns still in flight. Only traces
+        # with an open chat.turn span are tracked, so other spans (HTTP
+        # requests, background work) never accumulate here.
+        self._stages: Dict[int, List] = {}
+
+    def on_start(self, span, parent_context=None):
+        if span.name == TURN_SPAN:
+            self._stages[span.context.trace_id] = []
+
+    def on_end(self, span):
+        trace_id = span.context.trace_id
+        duration_ms = (span.end_time - span.start_time) / 1e6
+        if span.name != TURN_SPAN:
+            stages = self._stages.get(trace_id)
+            if stages is not None:
+                stages.append((span.name, round(duration_ms, 1)))
+            return
+
+        stages = self._stages.pop(trace_id, [])
+        if duration_ms < settings.slow_turn_threshold_ms:
+            return
+        if random.random() >= settings.slow_turn_log_sample_rate:
+            return
+        print("--- SLOW TURN " + json.dumps({
+            "trace_id": format(trace_id, "032x"),
+            "user_id": span.attributes.get("user.id"),
+            "total_ms": round(duration_ms, 1),
+            "stages": stages,
+        }))
+
+    def shutdown(self):
+        self._stages.clear()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from core.config import settings
+from db.models import User
+
+
+class UserCache:
+    """
+    Short-TTL LRU of User documents keyed by id, with an optional Redis tier
+    shared between workers. Entries are dropped by invalidate() whenever a
+    user document is saved, and expire after the TTL in any case.
+
+    Credentials are never written to Redis, so users read back from it
+    lack hashed_password: treat cached users as read-only and load from
+    MongoDB anything that needs the hash or will be saved.
+    """
+
+    REDIS_EXCLUDE = {"hashed_password"}
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._redis = None
+
+    # Read from settings on use so importing this module stays cheap
+    @property
+    def ttl(self) -> int:
+        return settings.user_cache_ttl_seconds
+
+    @property
+    def max_size(self) -> int:
+        return settings.user_cache_max_size
+
+    @property
+    def use_redis(self) -> bool:
+        return settings.user_cache_redis_enabled
+
+    def _redis_client(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(settings.redis_url)
+        return self._redis
+
+    @staticmethod
+    def _redis_key(user_id: str) -> str:
+        return f"user:{user_id}"
+
+    def _put_local(self, user_id: str, user: User):
+        self._entries[user_id] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, user_id: str) -> Optional[User]:
+        """Returns the user from the cache tiers, falling back to MongoDB."""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            expires_at, user = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(user_id)
+                return user
+            del self._entries[user_id]
+
+        if self.use_redis:
+            try:
+                raw = await self._redis_client().get(self._redis_key(user_id))
+                if raw:
+                    user = User.model_validate_json(raw)
+                    self._put_local(user_id, user)
+                    return user
+            except Exception as e:
+                print(f"⚠️ User cache Redis read error: {e}")
+
+        user = await User.get(user_id)
+        if user:
+            self._put_local(user_id, user)
+            if self.use_redis:
+                try:
+                    await self._redis_client().set(
+                        self._redis_key(user_id), user.model_dump_json(exclude=self.REDIS_EXCLUDE), ex=self.ttl
+                    )
+                except Exception as e:
+                    print(f"⚠️ User cache Redis write error: {e}")
+        return user
+
+    async def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+        if self.use_redis:
+            try:
+                await self._redis_client().delete(self._redis_key(user_id))
+            except Exception as e:
+                print(f"⚠️ User cache Redis delete error: {e}")
+
+
+user_cache = UserCache()
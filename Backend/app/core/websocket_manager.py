@@ -1,27 +1,31 @@
 from fastapi import WebSocket
-from typing import Dict
+from typing import Dict, Optional
+from core.metrics import ACTIVE_CONNECTIONS, WS_SEND_LATENCY, WS_SENDS_IN_PROGRESS
 
 class ConnectionManager:
     def __init__(self):
         # A dictionary to store active connections, mapping user_id to WebSocket
         self.active_connections: Dict[str, WebSocket] = {}
 
-    async def connect(self, websocket: WebSocket, user_id: str):
+    async def connect(self, websocket: WebSocket, user_id: str, subprotocol: Optional[str] = None):
         """Accepts a new WebSocket connection and associates it with a user_id."""
-        await websocket.accept()
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections[user_id] = websocket
+        ACTIVE_CONNECTIONS.set(len(self.active_connections))
 
     def disconnect(self, user_id: str):
         """Closes and removes a WebSocket connection for a given user_id."""
         if user_id in self.active_connections:
             # Although the connection might be closed already, we remove it from our dict
             del self.active_connections[user_id]
+        ACTIVE_CONNECTIONS.set(len(self.active_connections))
 
     async def send_personal_message(self, message: dict, user_id: str):
         """Sends a JSON message to a specific user's WebSocket."""
         if user_id in self.active_connections:
             websocket = self.active_connections[user_id]
-            await websocket.send_json(message)
+            with WS_SENDS_IN_PROGRESS.track_inprogress(), WS_SEND_LATENCY.time():
+                await websocket.send_json(message)
 
 # Create a single global instance of the manager
 manager = ConnectionManager()
@@ -1,6 +1,9 @@
 from beanie import Document
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from datetime import datetime
-from typing import Optional, Dict
+from enum import Enum
+from pydantic import Field
+from typing import Optional, Dict, List, Union
 
 class User(Document):
     # This model remains the same, with all user fields
@@ -11,23 +14,63 @@ class User(Document):
     google_id: Optional[str] = None
     provider: str = "local"
     profile_picture_url: Optional[str] = None
-    created_at: datetime = datetime.utcnow()
+    # Grants the /api/admin endpoints; set directly in the database, never via the API
+    is_moderator: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "users"
+        indexes = [
+            # Keyset pagination of the admin user list
+            IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        ]
 
 # --- REVERTED: ChatMessage Model ---
 # We have removed the 'conversation_id' field.
 # All messages are now only linked to a user.
+class MessageRole(str, Enum):
+    USER = "user"
+    BOT = "bot"
+
+    def __str__(self) -> str:
+        return self.value
+
+
 class ChatMessage(Document):
     user_id: str
-    role: str = "user"  # "user" or "bot"
-    content: str # This content is encrypted
+    role: MessageRole = MessageRole.USER
+    # Encrypted: base64 Fernet text (legacy) or raw token bytes (compact)
+    content: Union[str, bytes]
     metadata: Optional[Dict] = None
-    created_at: datetime = datetime.utcnow()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "chat_messages"
+        indexes = [
+            # Per-user history in order: context, history and training export
+            IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]),
+            # Keyset pagination of the admin listings, newest first
+            IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        ]
+
+# --- MessageBucket Model ---
+# Alternate storage (CHAT_STORAGE_MODEL=buckets): a user's messages are
+# appended to bucket documents of up to CHAT_BUCKET_SIZE entries, so a
+# history page is one or two document reads. Each entry keeps the fields
+# of a ChatMessage (including its _id) except user_id.
+class MessageBucket(Document):
+    user_id: str
+    # Number of messages; not "count", which would shadow Document.count()
+    size: int = 0
+    start: datetime
+    end: datetime
+    messages: List[Dict] = []
+
+    class Settings:
+        name = "chat_buckets"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("end", DESCENDING)]),
+        ]
 
 # --- Unchanged: ConversationState Model ---
 class ConversationState(Document):
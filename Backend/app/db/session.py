@@ -1,28 +1,69 @@
 import motor.motor_asyncio
 from beanie import init_beanie
+from typing import Optional
 from core.config import settings
-from db.models import User, ChatMessage, ConversationState # Import all your models
+from core.metrics import CommandLatencyListener
+from db.models import User, ChatMessage, ConversationState, MessageBucket # Import all your models
 
-async def init_db():
+# The one MongoDB client for this process. Created on startup by
+# connect_db() (called from the FastAPI lifespan) and closed by close_db().
+_client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
+
+
+def create_client(batch: bool = False) -> motor.motor_asyncio.AsyncIOMotorClient:
+    """
+    Builds a Motor client with the pool, timeout and compression settings.
+    Batch tools pass batch=True: their long cursors and bulk deletes must
+    not be cut off by the request-path socket timeout.
+    """
+    if settings.mongodb_url.startswith("mongomock://"):
+        # In-memory database for benchmarks and local experiments
+        from mongomock_motor import AsyncMongoMockClient
+
+        return AsyncMongoMockClient()
+    options = {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "maxIdleTimeMS": settings.mongodb_max_idle_time_ms,
+        "connectTimeoutMS": settings.mongodb_connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+        "readPreference": settings.mongodb_read_preference,
+        "event_listeners": [CommandLatencyListener()],
+    }
+    if not batch:
+        options["socketTimeoutMS"] = settings.mongodb_socket_timeout_ms
+    if settings.mongodb_compressors:
+        options["compressors"] = settings.mongodb_compressors
+    return motor.motor_asyncio.AsyncIOMotorClient(settings.mongodb_url, **options)
+
+
+async def connect_db() -> motor.motor_asyncio.AsyncIOMotorDatabase:
     """
-    Initializes the Beanie ODM with the MongoDB client and registers all Document models.
-    This function should be called on application startup.
+    Creates the shared client and initializes the Beanie ODM with all Document models.
+    This function should be called once on application startup.
     """
-    print("Attempting to connect to the database...")
-    
-    # Create the MongoDB client
-    client = motor.motor_asyncio.AsyncIOMotorClient(settings.mongodb_url)
-    
-    # Get the database object
-    database = client[settings.mongodb_db]
-
-    # Initialize beanie with the database and all your models
-    await init_beanie(
-        database=database,
-        document_models=[
-            User,
-            ChatMessage,
-            ConversationState
-        ]
-    )
-    print("✅ Database initialized successfully.")
+    global _client
+    if _client is None:
+        print("Attempting to connect to the database...")
+        _client = create_client()
+
+        # Initialize beanie with the database and all your models
+        await init_beanie(
+            database=_client[settings.mongodb_db],
+            document_models=[
+                User,
+                ChatMessage,
+                ConversationState,
+                MessageBucket
+            ]
+        )
+        print("✅ Database initialized successfully.")
+    return _client[settings.mongodb_db]
+
+
+async def close_db():
+    """Closes the shared client and its connection pool on shutdown."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
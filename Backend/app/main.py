@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.cors import CORSMiddleware
@@ -8,11 +9,43 @@ from starlette.middleware.cors import CORSMiddleware
 from .api import auth as auth_router
 from .api import chat as chat_router
 from .api import users as users_router
-from .core.config import settings
-from .db.session import init_db
+from .api import metrics as metrics_router
+from .api import admin as admin_router
+from .core.config import settings, lazy_secret_key
+from .db.session import connect_db, close_db
+from .core.tracing import setup_tracing, shutdown_tracing
+from .core.loop_monitor import loop_monitor
+# Absolute imports on purpose: the services import these as
+# services.* / core.* and must share the running instances.
+from services.message_writer import message_writer
+from core.passwords import shutdown_executor
+from core.event_bus import event_bus
+from services.dashboard import dashboard_snapshot
+from services.admission import admission
 # ----------------------
 
-app = FastAPI(title="Kairos Wellness Companion")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("--- Application is starting up... ---")
+    setup_tracing()
+    await connect_db()
+    loop_monitor.start()
+    if settings.write_behind_enabled:
+        message_writer.start()
+    event_bus.start()
+    print("--- Application startup complete. ---")
+    yield
+    await loop_monitor.stop()
+    await dashboard_snapshot.stop()
+    await event_bus.stop()
+    await message_writer.stop()
+    await close_db()
+    shutdown_executor()
+    admission.shutdown()
+    shutdown_tracing()
+    print("--- Application shutdown complete. ---")
+
+app = FastAPI(title="Kairos Wellness Companion", lifespan=lifespan)
 
 # --- CORS Middleware ---
 origins = [
@@ -29,17 +62,14 @@ app.add_middleware(
 )
 # ----------------------
 
-app.add_middleware(SessionMiddleware, secret_key=settings.secret_key)
-
-@app.on_event("startup")
-async def startup_event():
-    print("--- Application is starting up... ---")
-    await init_db()
-    print("--- Application startup complete. ---")
+# Lazy so importing this module does not build Settings()
+app.add_middleware(SessionMiddleware, secret_key=lazy_secret_key)
 
 app.include_router(auth_router.router)
 app.include_router(chat_router.router)
 app.include_router(users_router.router)
+app.include_router(metrics_router.router)
+app.include_router(admin_router.router)
 
 @app.get("/")
 def read_root():
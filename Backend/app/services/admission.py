@@ -0,0 +1,144 @@
+"""
+Admission control for chat turns.
+
+Two limits keep a traffic spike from turning into unbounded pending Groq
+calls:
+
+  * per user: at most CHAT_MAX_INFLIGHT_PER_USER turns run at once, and up
+    to CHAT_MAX_QUEUED_PER_USER more wait behind them. Anything beyond
+    that is rejected with a "busy" frame.
+  * per lane: LLM calls share a lane's slots. A turn that waits longer
+    than the lane's queue timeout is shed and served a fallback reply
+    instead of timing out.
+
+Turns with crisis language (services.escalation) use the "crisis" lane.
+It has its own reserved slots, its own worker threads and a tighter call
+timeout, and crisis turns are counted apart from the user's normal turns
+(CRISIS_MAX_INFLIGHT_PER_USER at once, plus the same queue allowance).
+Their latency therefore does not depend on how busy the "normal" lane is,
+while one client sending crisis words in every message still cannot take
+over the reserved slots.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from core.config import settings
+from core.metrics import ADMISSION_REJECTED, LLM_INFLIGHT, LLM_QUEUE_WAIT
+
+NORMAL = "normal"
+CRISIS = "crisis"
+
+
+class Overloaded(Exception):
+    """Raised when a turn is not admitted; `reason` says which limit hit."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Lane:
+    """A pool of LLM slots with its own queue SLO, call timeout and threads."""
+
+    def __init__(self, name: str, slots: int, queue_timeout_ms: int, call_timeout_ms: int):
+        self.name = name
+        self.size = slots
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.call_timeout = call_timeout_ms / 1000
+        # The Groq client is synchronous: give each lane its own threads so
+        # a saturated lane cannot starve another of executor workers.
+        self.executor = ThreadPoolExecutor(max_workers=slots, thread_name_prefix=f"llm-{name}")
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        # Created on first use so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        return self._slots
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds a slot in this lane; raises Overloaded if the wait exceeds the SLO."""
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            LLM_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - started)
+            ADMISSION_REJECTED.labels("shed", self.name).inc()
+            raise Overloaded("shed")
+        LLM_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - started)
+        LLM_INFLIGHT.labels(self.name).inc()
+        try:
+            yield
+        finally:
+            LLM_INFLIGHT.labels(self.name).dec()
+            self.slots.release()
+
+
+class AdmissionController:
+    def __init__(self):
+        self._user_slots: Dict[Tuple[str, str], asyncio.Semaphore] = {}
+        self._user_pending: Dict[Tuple[str, str], int] = {}
+        self._lanes: Dict[str, Lane] = {}
+
+    def lane(self, name: str) -> Lane:
+        lane = self._lanes.get(name)
+        if lane is None:
+            if name == CRISIS:
+                lane = Lane(CRISIS, settings.crisis_llm_max_concurrency,
+                            settings.crisis_llm_queue_timeout_ms, settings.crisis_llm_timeout_ms)
+            else:
+                lane = Lane(NORMAL, settings.llm_max_concurrency,
+                            settings.llm_queue_timeout_ms, settings.llm_timeout_ms)
+            self._lanes[name] = lane
+        return lane
+
+    @asynccontextmanager
+    async def user_turn(
+        self,
+        user_id: str,
+        lane: str = NORMAL,
+        on_queued: Optional[Callable[[], Awaitable]] = None,
+    ):
+        """
+        Holds one of the user's turn slots, queueing or rejecting extras.
+        on_queued is awaited first when the turn has to wait for a slot.
+        Crisis turns have their own per-user slots, so they never wait
+        behind the user's normal turns.
+        """
+        inflight = (
+            settings.crisis_max_inflight_per_user if lane == CRISIS
+            else settings.chat_max_inflight_per_user
+        )
+        key = (lane, user_id)
+        pending = self._user_pending.get(key, 0)
+        if pending >= inflight + settings.chat_max_queued_per_user:
+            ADMISSION_REJECTED.labels("user_limit", lane).inc()
+            raise Overloaded("user_limit")
+
+        slots = self._user_slots.get(key)
+        if slots is None:
+            slots = self._user_slots[key] = asyncio.Semaphore(inflight)
+        self._user_pending[key] = pending + 1
+        try:
+            if slots.locked() and on_queued is not None:
+                await on_queued()
+            async with slots:
+                yield
+        finally:
+            self._user_pending[key] -= 1
+            if not self._user_pending[key]:
+                del self._user_pending[key]
+                self._user_slots.pop(key, None)
+
+    def shutdown(self):
+        for lane in self._lanes.values():
+            lane.executor.shutdown(wait=False)
+        self._lanes = {}
+
+
+admission = AdmissionController()
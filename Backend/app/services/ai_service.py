@@ -1,22 +1,20 @@
 import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor
 from typing import Optional, Dict, Any, List
-from groq import Groq
 from core.config import settings
+from core.metrics import FALLBACK_RESPONSES, LLM_LATENCY
+from core.tracing import tracer
 
 
 class AIService:
     def __init__(self):
-        """Initialize Groq client and empathy prompts"""
-        try:
-            self.client = Groq(api_key=settings.groq_api_key)
-            self.model = settings.groq_model
-            self.ready = True
-            print("✅ Groq AI service initialized successfully")
-        except Exception as e:
-            print(f"❌ Failed to initialize Groq AI service: {e}")
-            self.client = None
-            self.ready = False
-        
+        """Set up empathy prompts; the Groq client is created on first use"""
+        self._client = None
+        self._client_failed = False
+        self._reply_client = None
+
         # System prompt for empathic replies
         self.system_prompt = """You are a compassionate mental wellness assistant for youth. Your role is to:
 1. LISTEN with empathy and validate feelings
@@ -35,33 +33,70 @@ Be genuine, warm, and supportive. Avoid clinical language."""
             "I hear you. Would you like to share more about what you're going through?",
         ]
 
+    @property
+    def client(self):
+        """Lazily constructed Groq client (None if it could not be created)"""
+        if self._client is None and not self._client_failed:
+            try:
+                from groq import Groq
+
+                self._client = Groq(api_key=settings.groq_api_key, base_url=settings.groq_base_url)
+                print("✅ Groq AI service initialized successfully")
+            except Exception as e:
+                print(f"❌ Failed to initialize Groq AI service: {e}")
+                self._client_failed = True
+        return self._client
+
+    @property
+    def reply_client(self):
+        """
+        The client for chat replies, with retries off: each admission lane
+        has exactly as many threads as slots, so a call must end within its
+        timeout instead of retrying on a thread the lane has released.
+        """
+        if self._reply_client is None and self.client is not None:
+            self._reply_client = self.client.with_options(max_retries=0)
+        return self._reply_client
+
+    @property
+    def ready(self) -> bool:
+        return self.client is not None
+
+    @property
+    def model(self) -> str:
+        return settings.groq_model
+
     # --- THIS IS THE NEW FUNCTION ---
     async def generate_title_for_text(self, text: str) -> str:
         """Generates a short, concise title (3-5 words) for a given text."""
         if not self.ready or not self.client:
+            FALLBACK_RESPONSES.labels("generate_title_for_text", "not_ready").inc()
             return "New Conversation"
 
         try:
             # A specific prompt to ask the AI for a short title
             prompt = f'Generate a very short, concise title (3-5 words max) for the following conversation starter. Respond with only the title and nothing else.\n\nMessage: "{text}"'
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=20,
-                temperature=0.3
-            )
+            with LLM_LATENCY.labels("generate_title_for_text").time():
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=20,
+                    temperature=0.3
+                )
             
             # Clean up the response to get just the title
             title = response.choices[0].message.content.strip().replace('"', '')
             return title if title else "New Conversation"
         except Exception as e:
             print(f"⚠️ Title generation error: {e}")
+            FALLBACK_RESPONSES.labels("generate_title_for_text", "error").inc()
             return "New Conversation" # Return a default title on error
     
     def analyze_emotion(self, text: str) -> Dict[str, Any]:
         """Analyze emotion using Groq API with prompt engineering"""
         if not self.ready or not self.client:
+            FALLBACK_RESPONSES.labels("analyze_emotion", "not_ready").inc()
             return {"label": "neutral", "score": 0.5, "source": "fallback"}
         
         try:
@@ -74,12 +109,13 @@ Message to analyze: "{text}"
 
 Respond with only the JSON object, no other text."""
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": emotion_prompt}],
-                max_tokens=100,
-                temperature=0.1
-            )
+            with LLM_LATENCY.labels("analyze_emotion").time():
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": emotion_prompt}],
+                    max_tokens=100,
+                    temperature=0.1
+                )
             
             result_text = response.choices[0].message.content.strip()
             
@@ -93,24 +129,35 @@ Respond with only the JSON object, no other text."""
                     "source": "groq"
                 }
             except json.JSONDecodeError:
+                FALLBACK_RESPONSES.labels("analyze_emotion", "bad_output").inc()
                 return {"label": "neutral", "score": 0.5, "intensity": "moderate", "source": "fallback"}
                 
         except Exception as e:
             print(f"⚠️ Emotion analysis error: {e}")
+            FALLBACK_RESPONSES.labels("analyze_emotion", "error").inc()
             return {"label": "neutral", "score": 0.5, "intensity": "moderate", "source": "error_fallback"}
 
+    async def analyze_emotion_async(self, text: str) -> Dict[str, Any]:
+        """analyze_emotion without blocking the event loop on the Groq call"""
+        return await asyncio.to_thread(self.analyze_emotion, text)
+
     async def get_conversation_context(self, user_id: str, limit: int = 5) -> str:
         """Get recent conversation context for better responses"""
         try:
             from db.models import ChatMessage
             from utils.encryption import decrypt_text
             
-            docs = await (
-                ChatMessage.find({"user_id": user_id})
-                .sort(-ChatMessage.created_at)
-                .limit(limit)
-                .to_list()
-            )
+            with tracer.start_as_current_span("db.context_fetch"):
+                if settings.chat_storage_model == "buckets":
+                    from services.history import get_history_page
+                    docs = list(reversed(await get_history_page(user_id, limit=limit)))
+                else:
+                    docs = await (
+                        ChatMessage.find({"user_id": user_id})
+                        .sort(-ChatMessage.created_at)
+                        .limit(limit)
+                        .to_list()
+                    )
             
             if not docs:
                 return ""
@@ -130,10 +177,21 @@ Respond with only the JSON object, no other text."""
             print(f"⚠️ Context retrieval error: {e}")
             return ""
 
-    async def generate_empathic_reply(self, text: str, user_id: Optional[str] = None) -> str:
-        """Generate empathic reply using Groq API with conversation context"""
+    async def generate_empathic_reply(
+        self,
+        text: str,
+        user_id: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        Generate empathic reply using Groq API with conversation context.
+        The blocking Groq call runs on `executor` (the admission lane's
+        threads; default executor otherwise) and gives up after `timeout`.
+        """
         if not self.ready or not self.client:
             import random
+            FALLBACK_RESPONSES.labels("generate_empathic_reply", "not_ready").inc()
             return random.choice(self.fallback_responses)
 
         try:
@@ -148,7 +206,11 @@ Recent conversation context:
 
 Please respond as a compassionate mental wellness assistant. Be empathetic, supportive, and offer hope. Mix English and Hindi naturally. Keep it conversational and warm (2-3 sentences max)."""
 
-            response = self.client.chat.completions.create(
+            # The Groq client is synchronous; run it off the event loop.
+            # Without a lane timeout keep the client's own default.
+            extra = {"timeout": timeout} if timeout is not None else {}
+            create = functools.partial(
+                self.reply_client.chat.completions.create,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": self.system_prompt},
@@ -156,25 +218,43 @@ Please respond as a compassionate mental wellness assistant. Be empathetic, supp
                 ],
                 max_tokens=150,
                 temperature=0.7,
+                **extra,
             )
+            with tracer.start_as_current_span("llm.completion"), LLM_LATENCY.labels("generate_empathic_reply").time():
+                call = asyncio.get_running_loop().run_in_executor(
+                    executor, contextvars.copy_context().run, create
+                )
+                response = await asyncio.wait_for(call, timeout)
             
             reply = response.choices[0].message.content.strip()
             
             if not reply or len(reply.strip()) < 5:
                 import random
+                FALLBACK_RESPONSES.labels("generate_empathic_reply", "bad_output").inc()
                 return random.choice(self.fallback_responses)
             
             return reply
             
+        except asyncio.TimeoutError:
+            print(f"⚠️ Reply generation timed out after {timeout}s")
+            return self.fallback_reply("timeout")
         except Exception as e:
             print(f"⚠️ Reply generation error: {e}")
             import random
+            FALLBACK_RESPONSES.labels("generate_empathic_reply", "error").inc()
             return random.choice(self.fallback_responses)
 
+    def fallback_reply(self, reason: str) -> str:
+        """A canned empathic reply, counted under the given fallback reason"""
+        import random
+        FALLBACK_RESPONSES.labels("generate_empathic_reply", reason).inc()
+        return random.choice(self.fallback_responses)
+
     async def get_wellness_suggestions(self, emotion: str, user_id: Optional[str] = None) -> List[str]:
         """Get personalized wellness suggestions based on emotion"""
         # (This function remains the same, no changes needed)
         if not self.ready or not self.client:
+            FALLBACK_RESPONSES.labels("get_wellness_suggestions", "not_ready").inc()
             return [
                 "Take a few deep breaths",
                 "Write in a journal",
@@ -188,12 +268,13 @@ Format as a simple list, one activity per line. Keep each suggestion short and p
 
 Emotion: {emotion}"""
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": suggestions_prompt}],
-                max_tokens=200,
-                temperature=0.6
-            )
+            with LLM_LATENCY.labels("get_wellness_suggestions").time():
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": suggestions_prompt}],
+                    max_tokens=200,
+                    temperature=0.6
+                )
             
             suggestions_text = response.choices[0].message.content.strip()
             suggestions = [s.strip().lstrip('- ') for s in suggestions_text.split('\n') if s.strip()]
@@ -202,6 +283,7 @@ Emotion: {emotion}"""
             
         except Exception as e:
             print(f"⚠️ Suggestions generation error: {e}")
+            FALLBACK_RESPONSES.labels("get_wellness_suggestions", "error").inc()
             return ["Take a few deep breaths", "Write in a journal"]
 
 # Global instance
@@ -1,18 +1,32 @@
-from db.models import ChatMessage
+import asyncio
+from db.models import ChatMessage, MessageRole
 from .ai_service import ai_service
+from .message_writer import save_message
+from .history import get_history_page
+from .admission import CRISIS, NORMAL, Overloaded, admission
+from .escalation import is_crisis
+from core.event_bus import event_bus
+from core.metrics import CHAT_TURN_LATENCY
+from core.tracing import TURN_SPAN, current_trace_id, tracer
 from core.websocket_manager import manager
-from utils.encryption import encrypt_text, decrypt_text
-from typing import List
+from utils.encryption import encrypt_message, decrypt_text
+from bson import ObjectId
+from datetime import datetime
+from typing import List, Optional, Tuple
 
-async def get_user_chat_history(user_id: str) -> List[ChatMessage]:
+async def get_user_chat_history(
+    user_id: str,
+    after: Optional[Tuple[datetime, ObjectId]] = None,
+    limit: Optional[int] = None,
+) -> List[ChatMessage]:
     """
-    Retrieves and decrypts all chat messages for a given user,
-    sorted by creation time.
+    Retrieves and decrypts a user's chat messages, sorted by creation time.
+    Without a limit this is the whole history, archived months included;
+    with one it is the latest `limit` messages older than the
+    (created_at, _id) key `after`.
     """
     try:
-        docs = await ChatMessage.find(
-            {"user_id": user_id}
-        ).sort(+ChatMessage.created_at).to_list()
+        docs = await get_history_page(user_id, after=after, limit=limit)
         
         for doc in docs:
             try:
@@ -24,44 +38,125 @@ async def get_user_chat_history(user_id: str) -> List[ChatMessage]:
         print(f"--- DATABASE ERROR in get_user_chat_history: {e} ---")
         return []
 
+BUSY_MESSAGES = {
+    "queued": "Kairos is still replying to your last message. This one is next in line.",
+    "user_limit": "You're sending messages faster than Kairos can reply. Please wait for a reply before sending more.",
+}
+
+
+async def _send_busy(user_id: str, reason: str):
+    await manager.send_personal_message(
+        {"type": "busy", "reason": reason, "content": BUSY_MESSAGES[reason]},
+        user_id
+    )
+
+
 async def process_user_message(user_id: str, user_message: str):
+    """
+    Classifies the turn into an LLM lane, admits it and runs it. The user
+    is told with a "busy" frame when the turn has to queue behind their
+    earlier ones, and when it is refused because too many are pending.
+    Crisis turns go to the reserved crisis lane and are never refused.
+    """
+    lane = CRISIS if is_crisis(user_message) else NORMAL
+    try:
+        async with admission.user_turn(user_id, lane, on_queued=lambda: _send_busy(user_id, "queued")):
+            with CHAT_TURN_LATENCY.labels(lane).time():
+                await _process_turn(user_id, user_message, lane)
+    except Overloaded as e:
+        await _send_busy(user_id, e.reason)
+
+
+async def _process_turn(user_id: str, user_message: str, lane: str = NORMAL):
     """
     Saves the user's message, gets an AI response, saves the AI response,
     and then broadcasts the AI's reply back to the user via WebSocket.
+    Each stage is a child span of one chat.turn trace.
     """
-    try:
-        # 1. Save the user's message to the database
-        user_msg_doc = ChatMessage(
-            user_id=user_id,
-            role="user",
-            content=encrypt_text(user_message)
-        )
-        await user_msg_doc.insert()
+    attributes = {"user.id": user_id, "chat.lane": lane}
+    with tracer.start_as_current_span(TURN_SPAN, attributes=attributes) as turn:
+        trace_id = current_trace_id()
+        try:
+            # 1. Save the user's message to the database
+            crisis = lane == CRISIS
+            with tracer.start_as_current_span("encrypt.user_message"):
+                encrypted = encrypt_message(user_message)
+            with tracer.start_as_current_span("db.insert.user_message"):
+                user_msg_doc = ChatMessage(
+                    user_id=user_id,
+                    role=MessageRole.USER,
+                    content=encrypted,
+                    metadata={"crisis": True} if crisis else None
+                )
+                user_ack = await save_message(user_msg_doc)
+            event_bus.count_message()
+            if crisis:
+                await event_bus.emit({
+                    "type": "crisis",
+                    "message_id": str(user_msg_doc.id) if user_msg_doc.id else None,
+                    "user_id": user_id,
+                    "content": user_message,
+                })
 
-        # 2. Get the AI's reply
-        ai_reply_content = await ai_service.generate_empathic_reply(user_message, user_id=user_id)
+            # 2. Get the AI's reply (context fetch and LLM call are child spans).
+            # If no slot in the turn's lane frees up within the queue SLO,
+            # shed to a fallback.
+            degraded = False
+            llm_lane = admission.lane(lane)
+            try:
+                async with llm_lane.slot():
+                    ai_reply_content = await ai_service.generate_empathic_reply(
+                        user_message,
+                        user_id=user_id,
+                        executor=llm_lane.executor,
+                        timeout=llm_lane.call_timeout,
+                    )
+            except Overloaded:
+                degraded = True
+                turn.set_attribute("chat.shed", True)
+                ai_reply_content = ai_service.fallback_reply("shed")
+            # Timeouts and Groq errors also end in a canned reply
+            degraded = degraded or ai_reply_content in ai_service.fallback_responses
 
-        # 3. Save the AI's reply to the database
-        ai_msg_doc = ChatMessage(
-            user_id=user_id,
-            role="bot",
-            content=encrypt_text(ai_reply_content)
-        )
-        await ai_msg_doc.insert()
+            # 3. Save the AI's reply to the database
+            with tracer.start_as_current_span("encrypt.bot_message"):
+                encrypted = encrypt_message(ai_reply_content)
+            with tracer.start_as_current_span("db.insert.bot_message"):
+                ai_msg_doc = ChatMessage(
+                    user_id=user_id,
+                    role=MessageRole.BOT,
+                    content=encrypted
+                )
+                bot_ack = await save_message(ai_msg_doc)
+            event_bus.count_message()
 
-        # 4. Send the AI's reply back to the user via WebSocket
-        await manager.send_personal_message(
-            {
-                "role": "bot",
-                "content": ai_reply_content,
-            },
-            user_id
-        )
-    except Exception as e:
-        print(f"--- ERROR in process_user_message: {e} ---")
-        # Send an error message back to the user if something goes wrong
-        await manager.send_personal_message(
-            {"role": "bot", "content": "I'm sorry, an error occurred while processing your message."},
-            user_id
-        )
+            # With durable write-behind, don't reply until both writes are acked
+            acks = [ack for ack in (user_ack, bot_ack) if ack is not None]
+            if acks:
+                with tracer.start_as_current_span("db.flush_ack"):
+                    await asyncio.gather(*acks)
+
+            # 4. Send the AI's reply back to the user via WebSocket
+            with tracer.start_as_current_span("ws.send"):
+                await manager.send_personal_message(
+                    {
+                        "role": "bot",
+                        "content": ai_reply_content,
+                        "trace_id": trace_id,
+                        "degraded": degraded,
+                    },
+                    user_id
+                )
+        except Exception as e:
+            print(f"--- ERROR in process_user_message: {e} ---")
+            turn.record_exception(e)
+            # Send an error message back to the user if something goes wrong
+            await manager.send_personal_message(
+                {
+                    "role": "bot",
+                    "content": "I'm sorry, an error occurred while processing your message.",
+                    "trace_id": trace_id,
+                },
+                user_id
+            )
 
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+from core.config import settings
+from db.models import ChatMessage
+from utils.encryption import decrypt_text
+from .ai_service import ai_service
+
+ANALYSIS_WINDOW = 50
+SUMMARY_MESSAGES = 10
+ATTENTION_EMOTIONS = ["sadness", "fear", "anger"]
+
+
+def _summarize(user_id: str, docs: List[Dict]) -> Dict:
+    """Decrypts a user's recent messages and collects the metadata signals."""
+    conversation_text = []
+    emotions_found = []
+    crisis_indicators = []
+    for msg in docs:
+        try:
+            content = decrypt_text(msg["content"])
+        except Exception:
+            continue
+        conversation_text.append(f"{msg['role']}: {content}")
+        metadata = msg.get("metadata") or {}
+        if metadata.get("crisis"):
+            crisis_indicators.append({
+                "message": content,
+                "timestamp": msg["created_at"].isoformat()
+            })
+        emotion = (metadata.get("analysis") or {}).get("label")
+        if emotion:
+            emotions_found.append(emotion)
+
+    emotion_counts = {}
+    for emotion in emotions_found:
+        emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
+    return {
+        "user_id": user_id,
+        "total_messages": len(docs),
+        "emotion_distribution": emotion_counts,
+        "crisis_indicators": crisis_indicators,
+        "summary": "\n".join(conversation_text[-SUMMARY_MESSAGES:]),
+    }
+
+
+class ConversationAnalyzer:
+    """
+    Moderator conversation analysis, cached per user and keyed by the id of
+    the user's latest message: a result is reused until the user writes
+    again. Concurrent requests for the same user share one computation,
+    and bulk jobs analyze many users in the background with progress.
+    """
+
+    def __init__(self):
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._redis = None
+
+    @property
+    def use_redis(self) -> bool:
+        return settings.analysis_cache_redis_enabled
+
+    def _redis_client(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(settings.redis_url)
+        return self._redis
+
+    async def _latest_id(self, user_id: str):
+        latest = await ChatMessage.get_motor_collection().find_one(
+            {"user_id": user_id}, projection={"_id": 1}, sort=[("created_at", -1), ("_id", -1)],
+        )
+        return latest["_id"] if latest else None
+
+    async def _cached(self, user_id: str, key: str) -> Optional[Dict]:
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[0] == key:
+            self._cache.move_to_end(user_id)
+            return entry[1]
+        if self.use_redis:
+            try:
+                raw = await self._redis_client().get(f"analysis:{user_id}:{key}")
+                if raw:
+                    result = json.loads(raw)
+                    self._store_local(user_id, key, result)
+                    return result
+            except Exception as e:
+                print(f"⚠️ Analysis cache Redis read error: {e}")
+        return None
+
+    def _store_local(self, user_id: str, key: str, result: Dict):
+        self._cache[user_id] = (key, result)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > settings.analysis_cache_max_size:
+            self._cache.popitem(last=False)
+
+    async def _compute(self, user_id: str, key: str) -> Dict:
+        docs = await ChatMessage.get_motor_collection().find(
+            {"user_id": user_id},
+            projection={"role": 1, "content": 1, "metadata": 1, "created_at": 1},
+            sort=[("created_at", -1), ("_id", -1)],
+            limit=ANALYSIS_WINDOW,
+        ).to_list(length=ANALYSIS_WINDOW)
+        docs.reverse()
+        summary = await asyncio.to_thread(_summarize, user_id, docs)
+        sentiment = await ai_service.analyze_emotion_async(summary.pop("summary"))
+        result = {
+            **summary,
+            "overall_sentiment": sentiment,
+            "requires_attention": bool(summary["crisis_indicators"]) or sentiment.get("label") in ATTENTION_EMOTIONS,
+            "analysis_timestamp": datetime.utcnow().isoformat(),
+            "latest_message_id": key,
+        }
+        self._store_local(user_id, key, result)
+        if self.use_redis:
+            try:
+                await self._redis_client().set(
+                    f"analysis:{user_id}:{key}", json.dumps(result), ex=settings.analysis_cache_ttl_seconds
+                )
+            except Exception as e:
+                print(f"⚠️ Analysis cache Redis write error: {e}")
+        return result
+
+    async def analyze(self, user_id: str) -> Optional[Dict]:
+        """The user's analysis, or None when they have no messages."""
+        latest_id = await self._latest_id(user_id)
+        if latest_id is None:
+            return None
+        key = str(latest_id)
+        cached = await self._cached(user_id, key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        inflight_key = (user_id, key)
+        future = self._inflight.get(inflight_key)
+        if future is None:
+            future = asyncio.ensure_future(self._compute(user_id, key))
+            self._inflight[inflight_key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+        result = await asyncio.shield(future)
+        return {**result, "cached": False}
+
+    # --- Bulk jobs ---
+
+    def start_job(self, user_ids: List[str]) -> Dict:
+        user_ids = list(dict.fromkeys(user_ids))
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "running",
+            "total": len(user_ids),
+            "done": 0,
+            "failed": 0,
+            "started_at": time.time(),
+            "finished_at": None,
+            "results": {},
+        }
+        self._jobs[job_id] = job
+        while len(self._jobs) > settings.analysis_max_jobs:
+            self._jobs.popitem(last=False)
+        asyncio.get_running_loop().create_task(self._run_job(job, user_ids))
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        return self._jobs.get(job_id)
+
+    async def _run_job(self, job: Dict, user_ids: List[str]):
+        semaphore = asyncio.Semaphore(settings.analysis_bulk_concurrency)
+
+        async def one(user_id: str):
+            async with semaphore:
+                try:
+                    result = await self.analyze(user_id)
+                    job["results"][user_id] = result if result is not None else {"error": "no messages"}
+                except Exception as e:
+                    job["failed"] += 1
+                    job["results"][user_id] = {"error": str(e)}
+                finally:
+                    job["done"] += 1
+
+        await asyncio.gather(*(one(user_id) for user_id in user_ids))
+        job["status"] = "finished"
+        job["finished_at"] = time.time()
+
+
+conversation_analyzer = ConversationAnalyzer()
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from core.config import settings
+from db.models import ChatMessage, User
+
+
+class DashboardSnapshot:
+    """
+    The admin dashboard figures, served from memory. A request that finds
+    the snapshot older than DASHBOARD_REFRESH_SECONDS gets it as is and
+    starts one background refresh, so the counting queries only run while
+    someone is looking at the dashboard. With Redis enabled the snapshot is
+    shared between workers, and a short lock lets only one of them run the
+    queries per interval.
+    """
+
+    REDIS_KEY = "admin:dashboard"
+    LOCK_KEY = "admin:dashboard:lock"
+
+    def __init__(self):
+        self._snapshot: Optional[Dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._redis = None
+
+    @property
+    def interval(self) -> float:
+        return settings.dashboard_refresh_seconds
+
+    @property
+    def use_redis(self) -> bool:
+        return settings.dashboard_cache_redis_enabled
+
+    def _redis_client(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(settings.redis_url)
+        return self._redis
+
+    async def compute(self) -> Dict:
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        messages = ChatMessage.get_motor_collection()
+
+        # Total users only needs to be roughly right: use collection metadata
+        total_users = await User.get_motor_collection().estimated_document_count()
+        recent_messages = await messages.count_documents({"created_at": {"$gte": yesterday}})
+        flagged_count = await messages.count_documents({"metadata": {"$ne": None}})
+
+        emotions_sample = await messages.find(
+            {"metadata": {"$ne": None}, "created_at": {"$gte": yesterday}},
+            projection={"metadata.analysis.label": 1},
+            limit=100,
+        ).to_list(length=100)
+        emotion_counts = {}
+        for msg in emotions_sample:
+            analysis = (msg.get("metadata") or {}).get("analysis")
+            if analysis:
+                emotion = analysis.get("label", "neutral")
+                emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
+
+        return {
+            "total_users": total_users,
+            "messages_24h": recent_messages,
+            "flagged_messages": flagged_count,
+            "emotion_trends": emotion_counts,
+            "timestamp": datetime.utcnow().isoformat(),
+            "computed_at": time.time(),
+        }
+
+    async def refresh(self) -> Dict:
+        snapshot = await self.compute()
+        self._snapshot = snapshot
+        if self.use_redis:
+            try:
+                await self._redis_client().set(self.REDIS_KEY, json.dumps(snapshot), ex=int(self.interval * 3))
+            except Exception as e:
+                print(f"⚠️ Dashboard cache Redis write error: {e}")
+        return snapshot
+
+    async def _load_shared(self) -> Optional[Dict]:
+        try:
+            raw = await self._redis_client().get(self.REDIS_KEY)
+        except Exception as e:
+            print(f"⚠️ Dashboard cache Redis read error: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    async def get(self, fresh: bool = False) -> Dict:
+        """The latest snapshot plus its age; fresh=True recomputes it now."""
+        if fresh:
+            snapshot = await self.refresh()
+        else:
+            snapshot = self._snapshot
+            if self.use_redis:
+                shared = await self._load_shared()
+                if shared and (snapshot is None or shared["computed_at"] > snapshot["computed_at"]):
+                    snapshot = self._snapshot = shared
+            if snapshot is None:
+                snapshot = await self.refresh()
+            elif time.time() - snapshot["computed_at"] > self.interval:
+                self._refresh_in_background()
+        return {**snapshot, "age_seconds": round(time.time() - snapshot["computed_at"], 1)}
+
+    def _refresh_in_background(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._refresh_once())
+
+    async def _refresh_once(self):
+        try:
+            acquired = True
+            if self.use_redis:
+                acquired = await self._redis_client().set(
+                    self.LOCK_KEY, "1", nx=True, ex=max(1, int(self.interval))
+                )
+            if acquired:
+                await self.refresh()
+        except Exception as e:
+            print(f"⚠️ Dashboard refresh error: {e}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+dashboard_snapshot = DashboardSnapshot()
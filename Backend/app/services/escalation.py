@@ -4,9 +4,11 @@ from typing import Optional
 CRISIS_KEYWORDS = ["kill myself", "suicide", "end my life", "hurt myself", "want to die", "die by suicide"]
 
 
-async def check_crisis(text: str) -> Optional[str]:
+def is_crisis(text: str) -> bool:
+    """Cheap keyword check, used to route turns to the crisis LLM lane."""
     low = text.lower()
-    for kw in CRISIS_KEYWORDS:
-        if kw in low:
-            return "CRISIS"
-    return None
\ No newline at end of file
+    return any(kw in low for kw in CRISIS_KEYWORDS)
+
+
+async def check_crisis(text: str) -> Optional[str]:
+    return "CRISIS" if is_crisis(text) else None
\ No newline at end of file
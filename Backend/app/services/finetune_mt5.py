@@ -9,11 +9,9 @@ import json
 import logging
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from groq import Groq
 from core.config import settings
+from services.response_quality import score_response
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -24,17 +22,10 @@ class GroqEmpathyService:
     """
     
     def __init__(self):
-        """Initialize Groq client and empathy framework"""
-        try:
-            self.client = Groq(api_key=settings.groq_api_key)
-            self.model = settings.groq_model
-            self.ready = True
-            logger.info("✅ Groq Empathy Service initialized successfully")
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Groq service: {e}")
-            self.client = None
-            self.ready = False
-        
+        """Initialize empathy framework; the Groq client is created on first use"""
+        self._client = None
+        self._client_failed = False
+
         # Advanced empathy framework
         self.empathy_framework = {
             "core_principles": [
@@ -87,6 +78,28 @@ class GroqEmpathyService:
         - Respect for family while encouraging individual wellbeing
         """
 
+    @property
+    def client(self):
+        """Lazily constructed Groq client (None if it could not be created)"""
+        if self._client is None and not self._client_failed:
+            try:
+                from groq import Groq
+
+                self._client = Groq(api_key=settings.groq_api_key, base_url=settings.groq_base_url)
+                logger.info("✅ Groq Empathy Service initialized successfully")
+            except Exception as e:
+                logger.error(f"❌ Failed to initialize Groq service: {e}")
+                self._client_failed = True
+        return self._client
+
+    @property
+    def ready(self) -> bool:
+        return self.client is not None
+
+    @property
+    def model(self) -> str:
+        return settings.groq_model
+
     async def generate_contextual_empathy_response(
         self, 
         user_message: str, 
@@ -229,51 +242,7 @@ Respond with empathy, cultural sensitivity, and appropriate support. Focus on em
 
     def _analyze_response_quality(self, response: str, user_message: str) -> Dict:
         """Analyze quality and empathy elements of response"""
-        
-        elements_found = []
-        score = 0.5  # Base score
-        
-        # Check for validation language
-        validation_indicators = [
-            "samajh", "feel", "emotions", "valid", "understand", "hear you"
-        ]
-        if any(word in response.lower() for word in validation_indicators):
-            elements_found.append("validation")
-            score += 0.15
-        
-        # Check for empathy language
-        empathy_indicators = [
-            "tough", "difficult", "challenging", "mushkil", "hard"
-        ]
-        if any(word in response.lower() for word in empathy_indicators):
-            elements_found.append("empathy")
-            score += 0.15
-        
-        # Check for support language
-        support_indicators = [
-            "alone", "akele", "support", "help", "saath", "care"
-        ]
-        if any(word in response.lower() for word in support_indicators):
-            elements_found.append("support")
-            score += 0.1
-        
-        # Check for cultural sensitivity (code-switching)
-        hindi_words = ["hai", "hoon", "kya", "tum", "main", "aur", "se"]
-        if any(word in response.lower() for word in hindi_words):
-            elements_found.append("cultural_sensitivity")
-            score += 0.1
-        
-        # Check length appropriateness
-        if 50 <= len(response) <= 300:
-            score += 0.1
-        
-        cultural_fit = "high" if "cultural_sensitivity" in elements_found else "medium"
-        
-        return {
-            "score": min(score, 1.0),  # Cap at 1.0
-            "elements": elements_found,
-            "cultural_fit": cultural_fit
-        }
+        return score_response(response)
 
     def _get_fallback_response(self, user_message: str) -> Dict:
         """Generate fallback response when API fails"""
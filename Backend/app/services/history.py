@@ -0,0 +1,89 @@
+"""
+Chat history reads across the hot collection and the monthly archives.
+
+Messages older than CHAT_ARCHIVE_AFTER_DAYS are moved by
+tasks.archive_chat_messages into chat_messages_archive_YYYYMM collections.
+Archived documents keep their _id and fields. Crisis and flagged messages
+stay in the hot collection at any age, so the hot results are not all newer
+than the archived ones: the reader merges both tiers by (created_at, _id)
+and only then cuts the page.
+"""
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from core.config import settings
+from db.models import ChatMessage
+from utils.pagination import older_than
+from .message_buckets import get_bucket_history_page
+
+ARCHIVE_PREFIX = "chat_messages_archive_"
+
+
+def archive_collection_name(when: datetime) -> str:
+    return f"{ARCHIVE_PREFIX}{when:%Y%m}"
+
+
+async def archive_collection_names(db) -> List[str]:
+    """Archive collections, newest month first."""
+    names = await db.list_collection_names(filter={"name": {"$regex": f"^{ARCHIVE_PREFIX}"}})
+    return sorted(names, reverse=True)
+
+
+def _month_end(name: str) -> datetime:
+    """Start of the month after an archive collection's month."""
+    year, month = int(name[-6:-2]), int(name[-2:])
+    return datetime(year + month // 12, month % 12 + 1, 1)
+
+
+def _newest_first(docs: List[ChatMessage]) -> List[ChatMessage]:
+    return sorted(docs, key=lambda doc: (doc.created_at, doc.id), reverse=True)
+
+
+async def get_history_page(
+    user_id: str,
+    after: Optional[Tuple[datetime, ObjectId]] = None,
+    limit: Optional[int] = None,
+) -> List[ChatMessage]:
+    """
+    Returns up to `limit` of the user's messages that sort before the
+    (created_at, _id) key `after` (all of them when limit is None), oldest
+    first and still encrypted.
+    """
+    if settings.chat_storage_model == "buckets":
+        return await get_bucket_history_page(user_id, after=after, limit=limit)
+
+    query = {"user_id": user_id}
+    if after is not None:
+        query.update(older_than(*after))
+
+    hot = ChatMessage.find(query).sort([("created_at", -1), ("_id", -1)])
+    if limit is not None:
+        hot = hot.limit(limit)
+    docs = await hot.to_list()
+
+    db = ChatMessage.get_motor_collection().database
+    # A message may briefly exist in both tiers while the archive job runs
+    seen = {doc.id for doc in docs}
+    for name in await archive_collection_names(db):
+        if after is not None and name > archive_collection_name(after[0]):
+            continue
+        if limit is not None and len(docs) >= limit:
+            # Months are walked newest first; stop once the page's oldest
+            # candidate is newer than anything this month can hold.
+            docs = _newest_first(docs)[:limit]
+            if docs[-1].created_at >= _month_end(name):
+                break
+        raw = await db[name].find(
+            query, sort=[("created_at", -1), ("_id", -1)], limit=limit or 0,
+        ).to_list(length=limit)
+        for item in raw:
+            if item["_id"] not in seen:
+                seen.add(item["_id"])
+                docs.append(ChatMessage.model_validate(item))
+
+    docs = _newest_first(docs)
+    if limit is not None:
+        docs = docs[:limit]
+    docs.reverse()
+    return docs
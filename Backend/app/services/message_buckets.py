@@ -0,0 +1,81 @@
+"""
+Per-user bucket storage for chat messages (CHAT_STORAGE_MODEL=dual|buckets).
+
+Messages are appended with $push to the user's open bucket, a bucket with
+fewer than CHAT_BUCKET_SIZE entries. When none is open the upsert starts a
+new one. Concurrent first writes can open two buckets for a user; readers
+sort entries by time, so that only makes the buckets smaller.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from core.config import settings
+from db.models import ChatMessage, MessageBucket
+
+
+def bucket_entry(doc: ChatMessage) -> Dict:
+    """The bucket form of a message; assigns the _id if it has none yet."""
+    if doc.id is None:
+        doc.id = ObjectId()
+    return {
+        "_id": doc.id,
+        "role": doc.role.value,
+        "content": doc.content,
+        "metadata": doc.metadata,
+        "created_at": doc.created_at,
+    }
+
+
+async def append_message(doc: ChatMessage):
+    entry = bucket_entry(doc)
+    await MessageBucket.get_motor_collection().update_one(
+        {"user_id": doc.user_id, "size": {"$lt": settings.chat_bucket_size}},
+        {
+            "$push": {"messages": entry},
+            "$inc": {"size": 1},
+            "$min": {"start": entry["created_at"]},
+            "$max": {"end": entry["created_at"]},
+        },
+        upsert=True,
+    )
+
+
+def _to_message(user_id: str, entry: Dict) -> ChatMessage:
+    return ChatMessage.model_validate({**entry, "user_id": user_id})
+
+
+async def get_bucket_history_page(
+    user_id: str,
+    after: Optional[Tuple[datetime, ObjectId]] = None,
+    limit: Optional[int] = None,
+) -> List[ChatMessage]:
+    """Same contract as history.get_history_page, served from buckets."""
+    query: Dict = {"user_id": user_id}
+    if after is not None:
+        query["start"] = {"$lte": after[0]}
+    cursor = MessageBucket.get_motor_collection().find(query, sort=[("end", -1)])
+
+    entries: List[Dict] = []
+    seen = set()
+    async for bucket in cursor:
+        if limit is not None and len(entries) >= limit:
+            # Buckets can overlap in time, so only stop once this one ends
+            # before the oldest message that would make the page.
+            entries.sort(key=lambda e: (e["created_at"], e["_id"]), reverse=True)
+            entries = entries[:limit]
+            if bucket["end"] < entries[-1]["created_at"]:
+                break
+        for e in bucket["messages"]:
+            # A message the backfill copied while it was also dual-written
+            # can sit in two buckets
+            if e["_id"] in seen or (after is not None and (e["created_at"], e["_id"]) >= after):
+                continue
+            seen.add(e["_id"])
+            entries.append(e)
+
+    entries.sort(key=lambda e: (e["created_at"], e["_id"]), reverse=True)
+    if limit is not None:
+        entries = entries[:limit]
+    entries.reverse()
+    return [_to_message(user_id, e) for e in entries]
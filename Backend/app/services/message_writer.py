@@ -0,0 +1,121 @@
+"""
+Optional write-behind buffer for chat messages.
+
+When enabled, ChatMessage documents are queued and written with one
+insert_many per batch (every write_behind_flush_ms or write_behind_batch_size
+documents) instead of one insert per message. In durable mode the caller
+gets a future that resolves once its batch is acknowledged by MongoDB.
+"""
+
+import asyncio
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from core.config import settings
+from core.metrics import WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_QUEUE_DEPTH
+from db.models import ChatMessage
+from .message_buckets import append_message
+
+
+class MessageWriter:
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=settings.write_behind_queue_size)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Flushes everything already queued, then stops the flush task."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, doc: ChatMessage, ack: bool = False) -> Optional[asyncio.Future]:
+        """
+        Queues a document, waiting for space when the queue is full. Returns a
+        future that resolves when the document is persisted if ack is True.
+        """
+        # Assign the _id now so callers can reference the message (e.g. in
+        # moderator events) before its batch is written
+        if doc.id is None:
+            doc.id = ObjectId()
+        future = asyncio.get_running_loop().create_future() if ack else None
+        await self._queue.put((doc, future))
+        WRITE_BEHIND_QUEUE_DEPTH.set(self._queue.qsize())
+        return future
+
+    async def _run(self):
+        batch_size = settings.write_behind_batch_size
+        interval = settings.write_behind_flush_ms / 1000
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch: List[Tuple[ChatMessage, Optional[asyncio.Future]]] = [item]
+            # Give the batch a few milliseconds to fill unless it already can
+            if self._queue.qsize() < batch_size - 1:
+                await asyncio.sleep(interval)
+            while len(batch) < batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            WRITE_BEHIND_QUEUE_DEPTH.set(self._queue.qsize())
+            await self._flush(batch)
+
+        # Drain whatever arrived before the stop sentinel was processed
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        for start in range(0, len(remaining), batch_size):
+            await self._flush(remaining[start:start + batch_size])
+
+    async def _flush(self, batch):
+        WRITE_BEHIND_BATCH_SIZE.observe(len(batch))
+        try:
+            await ChatMessage.insert_many([doc for doc, _ in batch])
+        except Exception as e:
+            print(f"--- WRITE-BEHIND FLUSH ERROR ({len(batch)} messages): {e} ---")
+            for _, future in batch:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in batch:
+            if future is not None and not future.done():
+                future.set_result(None)
+
+
+message_writer = MessageWriter()
+
+
+async def save_message(doc: ChatMessage) -> Optional[asyncio.Future]:
+    """
+    Persists a chat message: a direct insert when write-behind is off,
+    otherwise a queued write. In durable mode the returned future must be
+    awaited before the reply is sent. Bucket appends (dual and buckets
+    storage models) are always written directly.
+
+    The moderator listings, flagging, dashboard, export, live feed and
+    conversation analysis read chat_messages only, so in buckets mode
+    crisis messages are still written there as well.
+    """
+    model = settings.chat_storage_model
+    if model in ("dual", "buckets"):
+        await append_message(doc)
+        if model == "buckets" and not (doc.metadata or {}).get("crisis"):
+            return None
+    if not message_writer.running:
+        await doc.insert()
+        return None
+    return await message_writer.submit(doc, ack=settings.write_behind_durable)
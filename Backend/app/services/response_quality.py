@@ -0,0 +1,65 @@
+"""
+Keyword-based quality scoring for empathic replies.
+
+Indicator lists are compiled once into case-insensitive regexes, so each
+category is a single C-level scan instead of a `lower()` copy plus one
+substring search per keyword. Matching keeps the original substring
+semantics (no word boundaries).
+"""
+
+import re
+from typing import Dict, Iterable, List
+
+
+# (category, indicators, score weight) in scoring order
+QUALITY_INDICATORS = [
+    ("validation", ["samajh", "feel", "emotions", "valid", "understand", "hear you"], 0.15),
+    ("empathy", ["tough", "difficult", "challenging", "mushkil", "hard"], 0.15),
+    ("support", ["alone", "akele", "support", "help", "saath", "care"], 0.1),
+    ("cultural_sensitivity", ["hai", "hoon", "kya", "tum", "main", "aur", "se"], 0.1),
+]
+
+# Romanised Hindi markers used for the code-switching ratio
+HINDI_MARKERS = frozenset([
+    "hai", "hain", "hoon", "ho", "kya", "tum", "tumhe", "tumhari", "main", "mujhe",
+    "aur", "se", "ke", "ki", "ka", "nahi", "bhi", "yeh", "ye", "mein", "kar", "sakte",
+    "raha", "rahi", "baat", "kuch", "bahut", "thoda", "akele", "saath", "mushkil", "samajh",
+])
+
+_COMPILED = [
+    (name, re.compile("|".join(re.escape(word) for word in words), re.IGNORECASE), weight)
+    for name, words, weight in QUALITY_INDICATORS
+]
+_TOKEN = re.compile(r"[a-z']+")
+
+
+def score_response(response: str) -> Dict:
+    """Scores one reply; same result as the original per-keyword scan."""
+    elements_found = [name for name, pattern, _ in _COMPILED if pattern.search(response)]
+    score = 0.5 + sum(weight for name, _, weight in _COMPILED if name in elements_found)
+
+    # Check length appropriateness
+    if 50 <= len(response) <= 300:
+        score += 0.1
+
+    return {
+        "score": min(score, 1.0),  # Cap at 1.0
+        "elements": elements_found,
+        "cultural_fit": "high" if "cultural_sensitivity" in elements_found else "medium",
+    }
+
+
+def language_metrics(response: str) -> Dict:
+    """Length and English/Hindi code-switching metrics for one reply."""
+    tokens = _TOKEN.findall(response.lower())
+    hindi = sum(1 for token in tokens if token in HINDI_MARKERS)
+    return {
+        "chars": len(response),
+        "words": len(tokens),
+        "hindi_ratio": hindi / len(tokens) if tokens else 0.0,
+    }
+
+
+def score_responses(responses: Iterable[str]) -> List[Dict]:
+    """Batch variant used by the offline evaluation harness."""
+    return [{**score_response(r), **language_metrics(r)} for r in responses]
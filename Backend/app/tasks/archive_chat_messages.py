@@ -0,0 +1,112 @@
+"""
+Moves chat messages older than CHAT_ARCHIVE_AFTER_DAYS out of the hot
+chat_messages collection into per-month chat_messages_archive_YYYYMM
+collections, keeping the hot collection and its indexes small.
+
+Crisis and flagged messages stay in the hot collection whatever their
+age, so the moderator listings, dashboard counts and flagging keep seeing
+them. The training export (tasks.export_training_pairs) reads both tiers.
+
+Each batch is copied before it is deleted, and documents keep their _id,
+so an interrupted run can simply be started again. services.history reads
+both tiers when a user pages back; the admin export reads whole months by
+(created_at, _id), so every archive collection gets an index for each.
+
+Usage (from Backend/app):
+    python -m tasks.archive_chat_messages --older-than-days 90
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+from core.config import settings
+from db.session import create_client
+from services.history import archive_collection_name, archive_collection_names
+
+DUPLICATE_KEY = 11000
+
+ARCHIVE_INDEXES = [
+    # History pages for one user
+    [("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+    # Admin export by time range
+    [("created_at", ASCENDING), ("_id", ASCENDING)],
+]
+
+
+async def ensure_archive_indexes(archive):
+    for keys in ARCHIVE_INDEXES:
+        await archive.create_index(keys)
+
+
+async def archive_chat_messages(
+    older_than_days: Optional[int] = None,
+    batch_size: int = 1_000,
+) -> int:
+    """Archives cold messages in batches. Returns the number of messages moved."""
+    days = older_than_days if older_than_days is not None else settings.chat_archive_after_days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    client = create_client(batch=True)
+    db = client[settings.mongodb_db]
+    hot = db["chat_messages"]
+    indexed = set()
+    moved = 0
+    try:
+        # Archives written before an index was added get it here too
+        for name in await archive_collection_names(db):
+            await ensure_archive_indexes(db[name])
+            indexed.add(name)
+
+        while True:
+            docs = await hot.find(
+                {
+                    "created_at": {"$lt": cutoff},
+                    "metadata.crisis": {"$ne": True},
+                    "metadata.flagged": {"$ne": True},
+                },
+                sort=[("_id", 1)], limit=batch_size,
+            ).to_list(length=batch_size)
+            if not docs:
+                break
+
+            by_month: Dict[str, List[Dict]] = defaultdict(list)
+            for doc in docs:
+                by_month[archive_collection_name(doc["created_at"])].append(doc)
+            for name, month_docs in by_month.items():
+                archive = db[name]
+                if name not in indexed:
+                    await ensure_archive_indexes(archive)
+                    indexed.add(name)
+                try:
+                    await archive.insert_many(month_docs, ordered=False)
+                except BulkWriteError as e:
+                    # Left over from an interrupted run: already archived
+                    if any(err["code"] != DUPLICATE_KEY for err in e.details["writeErrors"]):
+                        raise
+
+            await hot.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+            moved += len(docs)
+            print(f"   ...{moved} messages archived")
+    finally:
+        client.close()
+
+    print(f"✅ Archived {moved} messages older than {cutoff:%Y-%m-%d}")
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move cold chat messages into monthly archive collections.")
+    parser.add_argument("--older-than-days", type=int, default=None,
+                        help="Defaults to CHAT_ARCHIVE_AFTER_DAYS")
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    args = parser.parse_args()
+    asyncio.run(archive_chat_messages(args.older_than_days, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
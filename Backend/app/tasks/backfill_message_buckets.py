@@ -0,0 +1,96 @@
+"""
+Backfills chat_buckets from chat_messages, the second step of moving a
+deployment to per-user bucket storage:
+
+    1. Set CHAT_STORAGE_MODEL=dual. New messages go to both stores.
+    2. Run this backfill. It copies every message that is not in a bucket yet.
+    3. Set CHAT_STORAGE_MODEL=buckets once the backfill has finished.
+
+Only messages created before the run starts are copied: dual mode is
+already on by then, so later messages are bucketed by their own write.
+Older ones are matched by _id, so the backfill skips anything dual writes
+already bucketed and can be re-run after an interruption. Backfilled
+buckets hold up to CHAT_BUCKET_SIZE messages each, in time order.
+
+Usage (from Backend/app):
+    python -m tasks.backfill_message_buckets
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from core.config import settings
+from db.session import create_client
+
+
+def _bucket(user_id: str, entries: List[Dict]) -> Dict:
+    return {
+        "user_id": user_id,
+        "size": len(entries),
+        "start": entries[0]["created_at"],
+        "end": entries[-1]["created_at"],
+        "messages": entries,
+    }
+
+
+async def backfill_message_buckets(user_id: Optional[str] = None, batch_size: int = 1_000) -> int:
+    """Copies un-bucketed messages into new buckets. Returns the number copied."""
+    bucket_size = settings.chat_bucket_size
+    client = create_client(batch=True)
+    db = client[settings.mongodb_db]
+    buckets = db["chat_buckets"]
+    # Messages written from here on are dual-written and may land in a bucket
+    # after that user's snapshot below, so the cursor must not copy them again.
+    query: Dict = {"created_at": {"$lt": datetime.utcnow()}}
+    if user_id:
+        query["user_id"] = user_id
+    cursor = db["chat_messages"].find(
+        query,
+        projection={"user_id": 1, "role": 1, "content": 1, "metadata": 1, "created_at": 1},
+        sort=[("user_id", 1), ("created_at", 1), ("_id", 1)],
+        batch_size=batch_size,
+    )
+
+    current_user: Optional[str] = None
+    bucketed: set = set()
+    pending: List[Dict] = []
+    copied = 0
+
+    async def flush():
+        nonlocal pending, copied
+        if pending:
+            await buckets.insert_one(_bucket(current_user, pending))
+            copied += len(pending)
+            pending = []
+
+    try:
+        async for doc in cursor:
+            if doc["user_id"] != current_user:
+                await flush()
+                current_user = doc["user_id"]
+                bucketed = set(await buckets.distinct("messages._id", {"user_id": current_user}))
+            if doc["_id"] in bucketed:
+                continue
+            pending.append({k: v for k, v in doc.items() if k != "user_id"})
+            if len(pending) >= bucket_size:
+                await flush()
+        await flush()
+    finally:
+        client.close()
+
+    print(f"✅ Copied {copied} messages into chat_buckets")
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill per-user message buckets from chat_messages.")
+    parser.add_argument("--user-id", default=None, help="Only backfill this user")
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    args = parser.parse_args()
+    asyncio.run(backfill_message_buckets(args.user_id, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Converts existing chat_messages to the compact storage format: raw Fernet
+token bytes (BSON BinData) instead of base64 text, zstd-compressed inside
+the ciphertext for long messages.
+
+Only documents whose content is still a string are selected, so the tool
+can be stopped and re-run at any time. Each document is updated only if its
+content is unchanged since it was read.
+
+Usage (from Backend/app):
+    python -m tasks.compact_chat_messages --batch-size 1000
+    python -m tasks.compact_chat_messages --dry-run --limit 10000
+
+Set COMPACT_MESSAGES_ENABLED=true before (or while) migrating so that new
+messages are written compactly as well.
+"""
+
+import argparse
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from cryptography.fernet import InvalidToken
+from pymongo import UpdateOne
+
+from core.config import settings
+from db.session import create_client
+from utils.encryption import decrypt_text, encrypt_compact
+
+
+def _convert_batch(docs: List[Dict]) -> Tuple[List[UpdateOne], int, int, int]:
+    """Re-encrypts a batch. Returns (updates, bytes_before, bytes_after, unreadable)."""
+    updates = []
+    before = after = unreadable = 0
+    for doc in docs:
+        try:
+            plaintext = decrypt_text(doc["content"])
+        except (InvalidToken, ValueError, TypeError):
+            unreadable += 1
+            continue
+        compact = encrypt_compact(plaintext)
+        before += len(doc["content"])
+        after += len(compact)
+        updates.append(UpdateOne(
+            {"_id": doc["_id"], "content": doc["content"]},
+            {"$set": {"content": compact}},
+        ))
+    return updates, before, after, unreadable
+
+
+async def compact_chat_messages(
+    batch_size: int = 1_000,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """Migrates string-content messages in _id order. Returns migration totals."""
+    client = create_client(batch=True)
+    collection = client[settings.mongodb_db]["chat_messages"]
+    totals = {"converted": 0, "unreadable": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = None
+    seen = 0
+    try:
+        while limit is None or seen < limit:
+            query: Dict = {"content": {"$type": "string"}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            size = batch_size if limit is None else min(batch_size, limit - seen)
+            docs = await collection.find(
+                query, projection={"content": 1}, sort=[("_id", 1)], limit=size,
+            ).to_list(length=size)
+            if not docs:
+                break
+            last_id = docs[-1]["_id"]
+            seen += len(docs)
+
+            updates, before, after, unreadable = await asyncio.to_thread(_convert_batch, docs)
+            if updates and not dry_run:
+                await collection.bulk_write(updates, ordered=False)
+            totals["converted"] += len(updates)
+            totals["unreadable"] += unreadable
+            totals["bytes_before"] += before
+            totals["bytes_after"] += after
+            print(f"   ...{totals['converted']} converted, {totals['unreadable']} unreadable")
+    finally:
+        client.close()
+
+    saved = totals["bytes_before"] - totals["bytes_after"]
+    ratio = totals["bytes_after"] / totals["bytes_before"] if totals["bytes_before"] else 1.0
+    action = "Would convert" if dry_run else "Converted"
+    print(f"✅ {action} {totals['converted']} messages, content {ratio:.0%} of original size ({saved} bytes saved)")
+    if totals["unreadable"]:
+        print(f"⚠️  Skipped {totals['unreadable']} messages that could not be decrypted")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert chat_messages to the compact storage format.")
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many messages")
+    parser.add_argument("--dry-run", action="store_true", help="Report the savings without writing")
+    args = parser.parse_args()
+    asyncio.run(compact_chat_messages(args.batch_size, args.limit, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
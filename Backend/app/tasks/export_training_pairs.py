@@ -0,0 +1,265 @@
+"""
+Exports decrypted (user message, bot reply) pairs from production chats
+as sharded JSONL or Parquet files that train_mt5_empathy can read.
+
+The export walks `chat_messages` and the monthly archive collections
+with one cursor each, ordered by (user_id, created_at, _id), and merges
+them into a single stream, so memory stays constant no matter how large
+the collections are. Progress is checkpointed each time a shard is
+finished; re-running with the same output directory resumes from there.
+
+Usage (from Backend/app):
+    python -m tasks.export_training_pairs --out ../data/prod_pairs --format jsonl
+
+The output contains decrypted conversations. Keep it on encrypted storage
+and delete it once training is done.
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import os
+from typing import AsyncIterator, Dict, List, Optional
+
+from cryptography.fernet import InvalidToken
+
+from core.config import settings
+from db.session import create_client
+from services.escalation import CRISIS_KEYWORDS
+from services.history import archive_collection_names
+from utils.encryption import decrypt_text
+
+
+CHECKPOINT_FILE = "checkpoint.json"
+ERROR_REPLY = "I'm sorry, an error occurred while processing your message."
+
+
+def _fallback_replies() -> set:
+    """Canned replies that should never be used as training targets."""
+    from services.ai_service import ai_service
+    from services.finetune_mt5 import groq_empathy_service
+
+    replies = set(ai_service.fallback_responses)
+    replies.add(groq_empathy_service._get_simple_fallback())
+    replies.add(ERROR_REPLY)
+    return replies
+
+
+def _is_flagged(metadata: Optional[Dict]) -> bool:
+    return bool(metadata) and bool(metadata.get("crisis") or metadata.get("flagged"))
+
+
+def _has_crisis_language(text: str) -> bool:
+    low = text.lower()
+    return any(kw in low for kw in CRISIS_KEYWORDS)
+
+
+def _decrypt_batch(docs: List[Dict]) -> List[Dict]:
+    """Decrypts a batch in place; unreadable messages get content=None."""
+    for doc in docs:
+        try:
+            doc["content"] = decrypt_text(doc["content"])
+        except (InvalidToken, ValueError, TypeError):
+            doc["content"] = None
+    return docs
+
+
+class ShardWriter:
+    """Writes rows into numbered shards, finalising each one atomically."""
+
+    def __init__(self, out_dir: str, fmt: str, shard_size: int, shard_index: int = 0):
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.shard_size = shard_size
+        self.shard_index = shard_index
+        self.rows: List[Dict] = []
+
+    @property
+    def full(self) -> bool:
+        return len(self.rows) >= self.shard_size
+
+    def add(self, user_message: str, reply: str):
+        self.rows.append({"user_message": user_message, "empathetic_reply": reply})
+
+    def flush(self) -> Optional[str]:
+        if not self.rows:
+            return None
+        path = os.path.join(self.out_dir, f"pairs-{self.shard_index:05d}.{self.fmt}")
+        tmp_path = path + ".tmp"
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            pq.write_table(pa.Table.from_pylist(self.rows), tmp_path, compression="zstd")
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for row in self.rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+        self.rows = []
+        self.shard_index += 1
+        return path
+
+
+def _load_checkpoint(out_dir: str) -> Optional[Dict]:
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_checkpoint(out_dir: str, last_doc: Dict, shard_index: int, pairs: int):
+    state = {
+        "user_id": last_doc["user_id"],
+        "created_at": last_doc["created_at"].isoformat(),
+        "_id": str(last_doc["_id"]),
+        "shard_index": shard_index,
+        "pairs_written": pairs,
+    }
+    tmp_path = os.path.join(out_dir, CHECKPOINT_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, os.path.join(out_dir, CHECKPOINT_FILE))
+
+
+def _sort_key(doc: Dict):
+    return doc["user_id"], doc["created_at"], doc["_id"]
+
+
+async def _merge_sorted(cursors: List) -> AsyncIterator[Dict]:
+    """
+    Merges cursors that are each sorted by (user_id, created_at, _id).
+    A message caught in both tiers by a running archive job is yielded once.
+    """
+    iterators = [aiter(cursor) for cursor in cursors]
+    heap = []
+    for i, it in enumerate(iterators):
+        doc = await anext(it, None)
+        if doc is not None:
+            heap.append((_sort_key(doc), i, doc))
+    heapq.heapify(heap)
+
+    last_id = None
+    while heap:
+        _, i, doc = heap[0]
+        nxt = await anext(iterators[i], None)
+        if nxt is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (_sort_key(nxt), i, nxt))
+        if doc["_id"] != last_id:
+            last_id = doc["_id"]
+            yield doc
+
+
+def _resume_filter(checkpoint: Dict) -> Dict:
+    """Matches every message strictly after the checkpointed sort key."""
+    from datetime import datetime
+    from bson import ObjectId
+
+    user_id = checkpoint["user_id"]
+    created_at = datetime.fromisoformat(checkpoint["created_at"])
+    last_id = ObjectId(checkpoint["_id"])
+    return {"$or": [
+        {"user_id": {"$gt": user_id}},
+        {"user_id": user_id, "created_at": {"$gt": created_at}},
+        {"user_id": user_id, "created_at": created_at, "_id": {"$gt": last_id}},
+    ]}
+
+
+async def export_training_pairs(
+    out_dir: str,
+    fmt: str = "jsonl",
+    shard_size: int = 50_000,
+    batch_size: int = 1_000,
+) -> int:
+    """Streams chat_messages and its archives into training shards. Returns the total pairs written."""
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint = _load_checkpoint(out_dir)
+    query = _resume_filter(checkpoint) if checkpoint else {}
+    writer = ShardWriter(out_dir, fmt, shard_size, checkpoint["shard_index"] if checkpoint else 0)
+    pairs = checkpoint["pairs_written"] if checkpoint else 0
+    if checkpoint:
+        print(f"↩️  Resuming after user {checkpoint['user_id']} at shard {writer.shard_index}")
+
+    fallbacks = _fallback_replies()
+    client = create_client(batch=True)
+    db = client[settings.mongodb_db]
+    names = ["chat_messages"] + await archive_collection_names(db)
+    cursor = _merge_sorted([
+        db[name].find(
+            query,
+            projection={"user_id": 1, "role": 1, "content": 1, "metadata": 1, "created_at": 1},
+            sort=[("user_id", 1), ("created_at", 1), ("_id", 1)],
+            batch_size=batch_size,
+        )
+        for name in names
+    ])
+
+    # The user turn waiting for its reply; reset at every user boundary.
+    pending: Optional[Dict] = None
+    # Last document after which nothing was pending, i.e. a safe resume point.
+    last_safe: Optional[Dict] = None
+
+    async def consume(batch: List[Dict]):
+        nonlocal pending, pairs, last_safe
+        batch = await asyncio.to_thread(_decrypt_batch, batch)
+        for doc in batch:
+            if pending and pending["user_id"] != doc["user_id"]:
+                pending = None
+            if doc["role"] == "user":
+                pending = doc
+                continue
+            user_doc, pending = pending, None
+            last_safe = doc
+            if (
+                user_doc is None
+                or user_doc["content"] is None
+                or doc["content"] is None
+                or _is_flagged(user_doc.get("metadata"))
+                or _is_flagged(doc.get("metadata"))
+                or _has_crisis_language(user_doc["content"])
+                or doc["content"] in fallbacks
+            ):
+                continue
+            writer.add(user_doc["content"], doc["content"])
+            pairs += 1
+            if writer.full:
+                # A bot reply has just been consumed, so nothing is pending
+                # and this document is a safe place to resume from.
+                writer.flush()
+                _save_checkpoint(out_dir, doc, writer.shard_index, pairs)
+
+    try:
+        batch: List[Dict] = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                await consume(batch)
+                batch = []
+        if batch:
+            await consume(batch)
+        writer.flush()
+        if last_safe is not None:
+            _save_checkpoint(out_dir, last_safe, writer.shard_index, pairs)
+    finally:
+        client.close()
+
+    print(f"✅ Exported {pairs} pairs into {writer.shard_index} shards at {out_dir}")
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export decrypted chat pairs for MT5 training.")
+    parser.add_argument("--out", required=True, help="Output directory for shards and checkpoint")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--shard-size", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    args = parser.parse_args()
+    asyncio.run(export_training_pairs(args.out, args.format, args.shard_size, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
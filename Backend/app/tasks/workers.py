@@ -1,4 +1,5 @@
 # Celery worker stub — configure broker=redis://... in production
+import asyncio
 from celery import Celery
 from core.config import settings
 
@@ -9,4 +10,12 @@ celery = Celery(__name__, broker=settings.redis_url, backend=settings.redis_url)
 @celery.task
 def notify_moderators(message_id: str):
     print(f"[task] notify moderators about message {message_id}")
-# integrate email/webhook/slack here
\ No newline at end of file
+# integrate email/webhook/slack here
+
+
+@celery.task
+def archive_cold_messages():
+    # Schedule daily with celery beat or cron
+    from tasks.archive_chat_messages import archive_chat_messages
+
+    return asyncio.run(archive_chat_messages())
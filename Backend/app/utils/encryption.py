@@ -1,14 +1,77 @@
+import base64
+from functools import lru_cache
+from typing import Union
 from cryptography.fernet import Fernet
 from core.config import settings
+from core.metrics import CRYPTO_LATENCY
 
+# Compact messages carry one format byte inside the encrypted payload,
+# so whether a message was compressed is not visible in the database.
+_PLAIN = b"\x00"
+_ZSTD = b"\x01"
 
-# settings.fernet_key must be a 32 url-safe base64-encoded key
-fernet = Fernet(settings.fernet_key.encode())
+
+@lru_cache
+def get_fernet() -> Fernet:
+    # settings.fernet_key must be a 32 url-safe base64-encoded key
+    return Fernet(settings.fernet_key.encode())
+
+
+@lru_cache
+def _zstd():
+    # zstandard is optional; compact storage works without it, uncompressed
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
 
 
 def encrypt_text(plaintext: str) -> str:
-    return fernet.encrypt(plaintext.encode()).decode()
+    with CRYPTO_LATENCY.labels("encrypt").time():
+        return get_fernet().encrypt(plaintext.encode()).decode()
+
+
+def encrypt_compact(plaintext: str) -> bytes:
+    """
+    Encrypts into raw Fernet token bytes (stored as BSON BinData) instead of
+    base64 text, zstd-compressing messages above the configured size first.
+    """
+    with CRYPTO_LATENCY.labels("encrypt").time():
+        data = plaintext.encode()
+        zstd = _zstd()
+        if (
+            settings.message_compression_enabled
+            and zstd is not None
+            and len(data) >= settings.message_compression_min_bytes
+        ):
+            compressed = zstd.ZstdCompressor(level=settings.message_compression_level).compress(data)
+            payload = _ZSTD + compressed if len(compressed) < len(data) else _PLAIN + data
+        else:
+            payload = _PLAIN + data
+        return base64.urlsafe_b64decode(get_fernet().encrypt(payload))
+
+
+def encrypt_message(plaintext: str) -> Union[str, bytes]:
+    """Encrypts chat content in whichever format this deployment writes."""
+    if settings.compact_messages_enabled:
+        return encrypt_compact(plaintext)
+    return encrypt_text(plaintext)
 
 
-def decrypt_text(token: str) -> str:
-    return fernet.decrypt(token.encode()).decode()
\ No newline at end of file
+def decrypt_text(token: Union[str, bytes]) -> str:
+    """Decrypts both the legacy base64 text format and compact binary content."""
+    if isinstance(token, str):
+        with CRYPTO_LATENCY.labels("decrypt").time():
+            return get_fernet().decrypt(token.encode()).decode()
+    with CRYPTO_LATENCY.labels("decrypt").time():
+        payload = get_fernet().decrypt(base64.urlsafe_b64encode(bytes(token)))
+        marker, data = payload[:1], payload[1:]
+        if marker == _ZSTD:
+            zstd = _zstd()
+            if zstd is None:
+                raise ValueError("message is zstd-compressed but zstandard is not installed")
+            data = zstd.ZstdDecompressor().decompress(data)
+        elif marker != _PLAIN:
+            raise ValueError("unknown compact message format")
+        return data.decode()
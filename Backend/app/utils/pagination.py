@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Keyset pagination over (created_at, _id), newest first. The cursor is the
+# sort key of the last row of a page, so the next page starts right after it
+# no matter how many rows were inserted meanwhile.
+NEWEST_FIRST = [("created_at", -1), ("_id", -1)]
+
+
+def encode_cursor(created_at: datetime, doc_id: ObjectId) -> str:
+    raw = json.dumps({"t": created_at.isoformat(), "id": str(doc_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Raises ValueError for a cursor this module did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["t"]), ObjectId(data["id"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError("invalid pagination cursor") from e
+
+
+def older_than(created_at: datetime, doc_id: ObjectId) -> Dict:
+    """Condition matching rows that sort after (created_at, _id), newest first."""
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": doc_id}},
+    ]}
+
+
+def after_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    """Condition matching rows that sort after the cursor (newest first)."""
+    if not cursor:
+        return None
+    return older_than(*decode_cursor(cursor))
+
+
+def split_page(docs: List, limit: int) -> Tuple[List, Optional[str]]:
+    """
+    Takes limit + 1 documents and returns (page, cursor for the next page).
+    The cursor is None when there is no next page.
+    """
+    page = docs[:limit]
+    if len(docs) <= limit:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,42 @@
+import csv
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir / "app"))
+
+# Dummy secrets so Settings() can be built without app/.env
+for key, value in {
+    "SECRET_KEY": "benchmark-secret",
+    "FERNET_KEY": "7lPB9OscvY8IEUC5y_-mhAXL_hiwslIfgPYxsdkNS1E=",
+    "GROQ_API_KEY": "benchmark",
+    "GOOGLE_CLIENT_ID": "benchmark",
+    "GOOGLE_CLIENT_SECRET": "benchmark",
+}.items():
+    os.environ.setdefault(key, value)
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    """User messages from the training CSV plus a few crisis phrasings."""
+    with open(backend_dir / "data" / "empathy.csv", encoding="utf-8-sig", errors="replace", newline="") as f:
+        messages = [row["user_message"] for row in csv.DictReader(f) if row.get("user_message")]
+    messages += [
+        "Sometimes I just want to die, nothing is working",
+        "I have been thinking about how to end my life",
+        "I want to hurt myself when I get this angry",
+    ]
+    return messages
+
+
+@pytest.fixture(scope="session")
+def replies():
+    return [
+        "Main samajh raha hoon tum kya feel kar rahe ho. Ye sach mein mushkil hai, aur tum akele nahi ho.",
+        "That sounds really tough. Thoda time apne liye nikalo, and remember you can always share more here.",
+        "As an AI, I hear you. Tumhari feelings bilkul valid hain, kya tum bata sakte ho kya hua?",
+        "Ok.",
+    ]
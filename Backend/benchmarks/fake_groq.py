@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI-compatible Groq server for offline benchmarks.
+
+Serves POST /openai/v1/chat/completions (the path the groq client uses)
+with canned empathic replies after a configurable delay, optionally as a
+server-sent-event stream.
+
+Usage:
+    python benchmarks/fake_groq.py --port 9100 --latency-ms 400 --jitter-ms 100
+Then point the app at it with GROQ_BASE_URL=http://127.0.0.1:9100
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+REPLIES = [
+    "Main samajh raha hoon tum kya feel kar rahe ho. Ye sach mein mushkil hai, aur tum akele nahi ho.",
+    "That sounds really tough. Thoda time apne liye nikalo, and remember you can always share more here.",
+    "I hear you. Tumhari feelings bilkul valid hain, kya tum bata sakte ho ki sabse zyada kya pareshan kar raha hai?",
+]
+EMOTION_JSON = '{"label": "sadness", "score": 0.7, "intensity": "moderate"}'
+
+config = {"latency_ms": 400.0, "jitter_ms": 100.0, "chunk_delay_ms": 20.0, "error_rate": 0.0}
+
+
+def _pick_reply(body: dict) -> str:
+    prompt = body.get("messages", [{}])[-1].get("content", "")
+    if "JSON object" in prompt:
+        return EMOTION_JSON
+    return random.choice(REPLIES)
+
+
+def _completion(body: dict, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake-model"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 50, "completion_tokens": len(content.split()), "total_tokens": 50 + len(content.split())},
+    }
+
+
+async def _stream(body: dict, content: str):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    for word in content.split(" "):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-model"),
+            "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(config["chunk_delay_ms"] / 1000)
+    yield "data: [DONE]\n\n"
+
+
+async def chat_completions(request: Request):
+    body = await request.json()
+    delay = max(0.0, random.gauss(config["latency_ms"], config["jitter_ms"])) / 1000
+    await asyncio.sleep(delay)
+    if random.random() < config["error_rate"]:
+        return JSONResponse({"error": {"message": "fake overload", "type": "server_error"}}, status_code=503)
+    content = _pick_reply(body)
+    if body.get("stream"):
+        return StreamingResponse(_stream(body, content), media_type="text/event-stream")
+    return JSONResponse(_completion(body, content))
+
+
+app = Starlette(routes=[
+    Route("/openai/v1/chat/completions", chat_completions, methods=["POST"]),
+])
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Groq chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=config["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=config["jitter_ms"])
+    parser.add_argument("--chunk-delay-ms", type=float, default=config["chunk_delay_ms"])
+    parser.add_argument("--error-rate", type=float, default=config["error_rate"])
+    args = parser.parse_args()
+    config.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        chunk_delay_ms=args.chunk_delay_ms,
+        error_rate=args.error_rate,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+End-to-end chat load test, runnable fully offline.
+
+Starts benchmarks/fake_groq.py and the FastAPI app (against an in-memory
+mongomock database by default, or a real MongoDB via --mongo-url), drives
+N concurrent WebSocket users that each send M messages, and reports
+messages/sec, p50/p95/p99 turn latency and server memory per connection.
+Only real replies count as completed turns: fallback replies sent for
+shed or timed-out turns ("degraded": true) and turns refused by admission
+control are reported separately.
+
+Usage (from Backend/):
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/load_test.py --users 50 --messages 5 --groq-latency-ms 400
+    python benchmarks/load_test.py --mongo-url mongodb://localhost:27017 --out results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import websockets
+
+backend_dir = Path(__file__).resolve().parents[1]
+
+# Dummy secrets so Settings() can be built without app/.env
+BENCH_ENV = {
+    "SECRET_KEY": "benchmark-secret",
+    "FERNET_KEY": "7lPB9OscvY8IEUC5y_-mhAXL_hiwslIfgPYxsdkNS1E=",
+    "GROQ_API_KEY": "benchmark",
+    "GOOGLE_CLIENT_ID": "benchmark",
+    "GOOGLE_CLIENT_SECRET": "benchmark",
+    "MONGODB_DB": "kairos_benchmark",
+}
+
+MESSAGES = [
+    "I feel like nobody understands me",
+    "Mujhe bahut tension hai exams ke baare mein",
+    "I can't sleep properly at night",
+    "Sometimes I feel very lonely",
+    "I'm happy today because I talked to my best friend",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_kib(pid: int) -> int:
+    """Resident set size of a process in KiB (Linux only, 0 elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def start_processes(args, groq_port: int, app_port: int):
+    fake_groq = subprocess.Popen([
+        sys.executable, str(backend_dir / "benchmarks" / "fake_groq.py"),
+        "--port", str(groq_port),
+        "--latency-ms", str(args.groq_latency_ms),
+        "--jitter-ms", str(args.groq_jitter_ms),
+    ])
+    env = {
+        **os.environ,
+        **BENCH_ENV,
+        "MONGODB_URL": args.mongo_url,
+        "GROQ_BASE_URL": f"http://127.0.0.1:{groq_port}",
+        "PYTHONPATH": str(backend_dir / "app"),
+    }
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=backend_dir,
+        env=env,
+    )
+    return fake_groq, app
+
+
+async def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(base_url + "/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit("❌ App did not start in time")
+
+
+async def register_users(base_url: str, count: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        responses = await asyncio.gather(*[
+            client.post("/api/auth/register", json={"anonymous": True}) for _ in range(count)
+        ])
+    users = []
+    for response in responses:
+        response.raise_for_status()
+        data = response.json()
+        users.append((data["user_id"], data["access_token"]))
+    return users
+
+
+async def run_user(ws, messages: int, results: dict):
+    for i in range(messages):
+        start = time.perf_counter()
+        try:
+            await ws.send(json.dumps({"message": MESSAGES[i % len(MESSAGES)]}))
+            frame = json.loads(await asyncio.wait_for(ws.recv(), timeout=60))
+            while frame.get("type") == "busy" and frame.get("reason") == "queued":
+                # Queued behind an earlier turn: the reply is still coming
+                frame = json.loads(await asyncio.wait_for(ws.recv(), timeout=60))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if frame.get("type") == "busy":
+                results["rejected"].append(frame.get("reason"))
+            elif frame.get("degraded"):
+                results["degraded"].append(elapsed_ms)
+            elif "degraded" not in frame:
+                results["errors"].append(frame.get("content"))
+            else:
+                results["latencies"].append(elapsed_ms)
+        except Exception as e:
+            results["errors"].append(repr(e))
+
+
+async def run_benchmark(args, app_pid: int, app_port: int):
+    base_url = f"http://127.0.0.1:{app_port}"
+    await wait_until_up(base_url)
+    users = await register_users(base_url, args.users)
+
+    rss_before = rss_kib(app_pid)
+    sockets = await asyncio.gather(*[
+        websockets.connect(f"ws://127.0.0.1:{app_port}/api/chat/ws/{user_id}?token={token}")
+        for user_id, token in users
+    ])
+    await asyncio.sleep(0.5)
+    rss_connected = rss_kib(app_pid)
+
+    results = {"latencies": [], "degraded": [], "rejected": [], "errors": []}
+    start = time.perf_counter()
+    await asyncio.gather(*[run_user(ws, args.messages, results) for ws in sockets])
+    elapsed = time.perf_counter() - start
+    rss_after = rss_kib(app_pid)
+    await asyncio.gather(*[ws.close() for ws in sockets])
+    latencies, errors = results["latencies"], results["errors"]
+
+    return {
+        "users": args.users,
+        "messages_per_user": args.messages,
+        "groq_latency_ms": args.groq_latency_ms,
+        "mongo": "mongomock" if args.mongo_url.startswith("mongomock://") else "mongodb",
+        "completed": len(latencies),
+        "degraded": len(results["degraded"]),
+        "rejected": len(results["rejected"]),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "elapsed_s": elapsed,
+        "messages_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "turn_latency_ms": {
+            "p50": percentile(latencies, 50) if latencies else None,
+            "p95": percentile(latencies, 95) if latencies else None,
+            "p99": percentile(latencies, 99) if latencies else None,
+            "mean": statistics.fmean(latencies) if latencies else None,
+        },
+        "memory_kib": {
+            "before_connect": rss_before,
+            "after_connect": rss_connected,
+            "after_run": rss_after,
+            "per_connection": (rss_connected - rss_before) / args.users if rss_before else None,
+        },
+    }
+
+
+def print_report(result: dict):
+    lat = result["turn_latency_ms"]
+    mem = result["memory_kib"]
+    print(f"\n📊 {result['users']} users × {result['messages_per_user']} messages "
+          f"(fake Groq {result['groq_latency_ms']:.0f} ms, {result['mongo']})")
+    print(f"   completed {result['completed']}, degraded {result['degraded']}, "
+          f"rejected {result['rejected']}, errors {result['errors']}, {result['elapsed_s']:.1f}s")
+    print(f"   throughput      {result['messages_per_sec']:.1f} msg/s")
+    if lat["p50"] is not None:
+        print(f"   turn latency    p50 {lat['p50']:.0f} ms  p95 {lat['p95']:.0f} ms  p99 {lat['p99']:.0f} ms")
+    if mem["per_connection"] is not None:
+        print(f"   memory/conn     {mem['per_connection']:.1f} KiB (RSS {mem['before_connect']} → {mem['after_run']} KiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline WebSocket load test for the chat path")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=5, help="Messages per user")
+    parser.add_argument("--groq-latency-ms", type=float, default=400.0)
+    parser.add_argument("--groq-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--mongo-url", default="mongomock://", help="mongomock:// or a real MongoDB URL")
+    parser.add_argument("--out", help="Write the result as JSON to this file")
+    args = parser.parse_args()
+
+    groq_port, app_port = free_port(), free_port()
+    fake_groq, app = start_processes(args, groq_port, app_port)
+    try:
+        result = asyncio.run(run_benchmark(args, app.pid, app_port))
+    finally:
+        for proc in (app, fake_groq):
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    print_report(result)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\n✅ Result written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Micro-benchmarks for the per-message CPU work on the chat path.
+
+Store a baseline, then compare later runs against it and fail on
+regressions (from Backend/):
+
+    pytest benchmarks/test_micro_benchmarks.py --benchmark-autosave
+    pytest benchmarks/test_micro_benchmarks.py --benchmark-compare --benchmark-compare-fail=mean:15%
+"""
+
+import pytest
+
+from services.escalation import check_crisis
+from services.finetune_mt5 import groq_empathy_service
+from utils.encryption import decrypt_text, encrypt_text
+
+
+MESSAGE_SIZES = [64, 1024, 16384]
+HISTORY = [
+    {"role": "user", "content": "Mujhe bahut tension hai exams ke baare mein"},
+    {"role": "assistant", "content": "Exam tension bilkul normal hai, main samajh sakta hoon."},
+    {"role": "user", "content": "I can't sleep properly at night"},
+]
+
+
+def run_sync(coro):
+    """Drives a coroutine that never awaits, without event-loop overhead."""
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended; use an event loop instead")
+
+
+@pytest.mark.parametrize("size", MESSAGE_SIZES)
+def test_encrypt_text(benchmark, size):
+    plaintext = ("Main theek hoon, bas thoda stressed. " * (size // 36 + 1))[:size]
+    benchmark(encrypt_text, plaintext)
+
+
+@pytest.mark.parametrize("size", MESSAGE_SIZES)
+def test_decrypt_text(benchmark, size):
+    token = encrypt_text(("Main theek hoon, bas thoda stressed. " * (size // 36 + 1))[:size])
+    benchmark(decrypt_text, token)
+
+
+def test_check_crisis_corpus(benchmark, corpus):
+    def scan():
+        return [run_sync(check_crisis(message)) for message in corpus]
+
+    results = benchmark(scan)
+    assert "CRISIS" in results
+
+
+def test_build_empathy_prompt(benchmark):
+    benchmark(
+        groq_empathy_service._build_empathy_prompt,
+        "Mujhe gussa bohot aata hai chhoti chhoti baaton par",
+        HISTORY,
+        {"age_group": "18-24", "language": "hinglish"},
+    )
+
+
+def test_post_process_response(benchmark, replies):
+    def process():
+        return [groq_empathy_service._post_process_response(reply, "I feel low") for reply in replies]
+
+    benchmark(process)
+
+
+def test_analyze_response_quality(benchmark, replies):
+    def analyze():
+        return [groq_empathy_service._analyze_response_quality(reply, "I feel low") for reply in replies]
+
+    benchmark(analyze)
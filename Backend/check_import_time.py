@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the FastAPI app.
+
+Imports app.main in a fresh interpreter under `python -X importtime` and
+fails (exit code 1) when
+  - the cumulative import time of app.main exceeds the budget,
+  - a module that must stay lazy (Groq, authlib, passlib, ...) was
+    imported eagerly, or
+  - Settings() was built (core.config.get_settings was called).
+
+Run from the Backend directory, locally or in CI:
+    python check_import_time.py --budget-ms 1500
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+script_dir = Path(__file__).parent
+
+# Only imported on first use; importing any of them from app.main is a regression
+LAZY_MODULES = ["groq", "authlib", "passlib", "transformers", "torch", "datasets"]
+
+# Dummy values so Settings() can be built without a real .env
+DUMMY_ENV = {
+    "SECRET_KEY": "import-time-check",
+    "FERNET_KEY": "7lPB9OscvY8IEUC5y_-mhAXL_hiwslIfgPYxsdkNS1E=",
+    "GROQ_API_KEY": "import-time-check",
+    "GOOGLE_CLIENT_ID": "import-time-check",
+    "GOOGLE_CLIENT_SECRET": "import-time-check",
+}
+
+PROBE = (
+    "import sys, app.main; "
+    f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules)); "
+    # app.main imports app.core.config, the services import core.config
+    "print(sum(sys.modules[m].get_settings.cache_info().misses "
+    "for m in ('app.core.config', 'core.config') if m in sys.modules))"
+)
+
+
+def measure():
+    env = {**os.environ, **DUMMY_ENV}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(script_dir / "app"), env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=script_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise SystemExit("❌ Importing app.main failed")
+
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append((int(cumulative_us), int(self_us), name.strip()))
+    modules_line, settings_line = proc.stdout.splitlines()[-2:]
+    eager = [m for m in modules_line.split(",") if m]
+    return timings, eager, int(settings_line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when app.main imports too slowly.")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_TIME_BUDGET_MS", 1500)))
+    parser.add_argument("--top", type=int, default=15, help="How many of the slowest imports to list")
+    args = parser.parse_args()
+
+    timings, eager, settings_built = measure()
+    total_us = next((cum for cum, _, name in timings if name == "app.main"), None)
+    if total_us is None:
+        raise SystemExit("❌ app.main not found in -X importtime output")
+
+    print(f"⏱️  app.main imported in {total_us / 1000:.1f} ms (budget {args.budget_ms:.0f} ms)\n")
+    print("Slowest imports (self time):")
+    for cum, self_us, name in sorted(timings, key=lambda t: t[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self {cum / 1000:8.1f} ms cumulative  {name}")
+
+    failed = False
+    if eager:
+        print(f"\n❌ Modules that should be lazy were imported eagerly: {', '.join(eager)}")
+        failed = True
+    if settings_built:
+        print("\n❌ Settings() was built while importing app.main")
+        failed = True
+    if total_us / 1000 > args.budget_ms:
+        print(f"\n❌ Import time budget exceeded by {total_us / 1000 - args.budget_ms:.1f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\n✅ Import time within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Offline response-quality evaluation harness.
+
+Runs a fixed prompt set through one or more reply backends, scores every
+reply with the precompiled matcher in services/response_quality.py and
+writes a side-by-side report with latency percentiles per backend.
+
+Backends:
+    stub  - offline fake of the Groq service (canned replies, simulated latency)
+    groq  - the production AIService (needs GROQ_API_KEY in app/.env)
+    mt5   - a local fine-tuned MT5 model (see output/mt5-empathy)
+
+Usage:
+    python evaluate_responses.py --backends stub mt5 --limit 50 --out eval_report.json
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+script_dir = Path(__file__).parent
+app_dir = script_dir / "app"
+sys.path.insert(0, str(app_dir))
+
+from services.response_quality import score_responses  # noqa: E402
+
+
+def load_prompts(path: Path, limit: int):
+    """Unique user messages from the empathy CSV, in file order."""
+    prompts, seen = [], set()
+    with open(path, encoding="utf-8-sig", errors="replace", newline="") as f:
+        for row in csv.DictReader(f):
+            message = (row.get("user_message") or "").strip()
+            if message and message not in seen:
+                seen.add(message)
+                prompts.append(message)
+            if len(prompts) >= limit:
+                break
+    return prompts
+
+
+class StubBackend:
+    """Canned replies with simulated network latency; needs no API key."""
+
+    name = "stub"
+    replies = [
+        "Main samajh raha hoon tum kya feel kar rahe ho. Kya tum aur share karna chahoge?",
+        "That sounds really tough. You're not alone in feeling this way.",
+        "I hear you. Would you like to share more about what you're going through?",
+    ]
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.rng = random.Random(0)
+
+    async def reply(self, text: str) -> str:
+        await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        return self.rng.choice(self.replies)
+
+
+class GroqBackend:
+    """The production AIService, called without user context."""
+
+    name = "groq"
+
+    def __init__(self):
+        # Settings read app/.env wherever the script is run from
+        os.environ.setdefault("ENV_FILE", str(app_dir / ".env"))
+        from services.ai_service import ai_service
+
+        if not ai_service.ready:
+            raise RuntimeError("Groq AI service is not ready; check GROQ_API_KEY in app/.env")
+        self.service = ai_service
+        self.fallbacks = set(ai_service.fallback_responses)
+
+    async def reply(self, text: str) -> str:
+        return await self.service.generate_empathic_reply(text)
+
+
+class MT5Backend:
+    """A local fine-tuned MT5 checkpoint, run on CPU."""
+
+    name = "mt5"
+
+    def __init__(self, model_dir: str):
+        from transformers import MT5ForConditionalGeneration, MT5Tokenizer
+
+        self.tokenizer = MT5Tokenizer.from_pretrained(model_dir)
+        self.model = MT5ForConditionalGeneration.from_pretrained(model_dir)
+        self.model.eval()
+
+    def _generate(self, text: str) -> str:
+        import torch
+
+        inputs = self.tokenizer(f"User: {text}", return_tensors="pt", truncation=True, max_length=128)
+        with torch.no_grad():
+            output = self.model.generate(**inputs, max_new_tokens=80)
+        reply = self.tokenizer.decode(output[0], skip_special_tokens=True).strip()
+        return reply.removeprefix("Reply:").strip()
+
+    async def reply(self, text: str) -> str:
+        return await asyncio.to_thread(self._generate, text)
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def evaluate_backend(backend, prompts):
+    replies, latencies = [], []
+    for prompt in prompts:
+        start = time.perf_counter()
+        replies.append(await backend.reply(prompt))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    scores = score_responses(replies)
+    fallbacks = getattr(backend, "fallbacks", set())
+    elements = {}
+    for score in scores:
+        for element in score["elements"]:
+            elements[element] = elements.get(element, 0) + 1
+
+    return {
+        "backend": backend.name,
+        "prompts": len(prompts),
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": statistics.fmean(latencies),
+        },
+        "quality_score": statistics.fmean(s["score"] for s in scores),
+        "element_rates": {k: v / len(scores) for k, v in sorted(elements.items())},
+        "mean_chars": statistics.fmean(s["chars"] for s in scores),
+        "mean_hindi_ratio": statistics.fmean(s["hindi_ratio"] for s in scores),
+        "fallback_rate": sum(r in fallbacks for r in replies) / len(replies),
+        "samples": [{"prompt": p, "reply": r} for p, r in list(zip(prompts, replies))[:5]],
+    }
+
+
+def print_report(results):
+    header = f"{'backend':<8} {'score':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'chars':>6} {'hindi':>6} {'fallback':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        lat = r["latency_ms"]
+        print(
+            f"{r['backend']:<8} {r['quality_score']:>6.3f} {lat['p50']:>8.1f} {lat['p95']:>8.1f} "
+            f"{lat['p99']:>8.1f} {r['mean_chars']:>6.0f} {r['mean_hindi_ratio']:>6.2f} {r['fallback_rate']:>8.1%}"
+        )
+
+
+def build_backend(name: str, args):
+    if name == "stub":
+        return StubBackend(args.stub_latency_ms)
+    if name == "groq":
+        return GroqBackend()
+    if name == "mt5":
+        return MT5Backend(args.mt5_model_dir)
+    raise ValueError(f"Unknown backend: {name}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare reply quality and latency across backends.")
+    parser.add_argument("--backends", nargs="+", default=["stub"], choices=["stub", "groq", "mt5"])
+    parser.add_argument("--prompts", default=str(script_dir / "data" / "empathy.csv"))
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--stub-latency-ms", type=float, default=300.0)
+    parser.add_argument("--mt5-model-dir", default=str(script_dir / "output" / "mt5-empathy"))
+    parser.add_argument("--out", default="eval_report.json")
+    args = parser.parse_args()
+
+    prompts = load_prompts(Path(args.prompts), args.limit)
+    print(f"🧪 Evaluating {len(prompts)} prompts on: {', '.join(args.backends)}\n")
+
+    results = []
+    for name in args.backends:
+        backend = build_backend(name, args)
+        results.append(await evaluate_backend(backend, prompts))
+
+    print_report(results)
+    out_path = Path(args.out).resolve()
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Report written to {out_path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,26 +1,113 @@
 import os
-from datasets import load_dataset
+import csv
+import hashlib
+import json
+import shutil
+from datasets import Dataset, load_from_disk
 from transformers import MT5ForConditionalGeneration, MT5Tokenizer
 from transformers import Seq2SeqTrainer, Seq2SeqTrainingArguments, DataCollatorForSeq2Seq
 
 
+PREPROCESS_CACHE_DIR = "output/preprocessed"
+HASH_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
 # ------------------------------
-# 1. Clean CSV to UTF-8
+# 1. Stream training rows with UTF-8 repair
 # ------------------------------
-def clean_csv(input_file: str, output_file: str):
-    with open(input_file, "rb") as f:
-        raw = f.read()
-    text = raw.decode("utf-8", errors="replace")
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(text)
-    print(f"✅ Cleaned dataset saved to {output_file}")
+TRAINING_FILE_EXTENSIONS = (".csv", ".jsonl", ".parquet")
+
+
+def source_files(input_path: str):
+    """A single data file, or every supported shard in a directory (sorted)."""
+    if not os.path.isdir(input_path):
+        return [input_path]
+    return sorted(
+        os.path.join(input_path, name)
+        for name in os.listdir(input_path)
+        if name.endswith(TRAINING_FILE_EXTENSIONS)
+    )
+
+
+def _iter_raw_rows(input_file: str):
+    if input_file.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(input_file).iter_batches(columns=["user_message", "empathetic_reply"]):
+            yield from batch.to_pylist()
+        return
+    with open(input_file, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        if input_file.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def iter_clean_rows(input_file: str, source_key: str = ""):
+    """
+    Yields one {"user_message", "empathetic_reply"} dict per row of a CSV,
+    JSONL or Parquet file, or of every such shard in a directory (e.g. the
+    output of tasks/export_training_pairs.py). Bad bytes are replaced while
+    reading, so nothing is loaded fully into memory and no cleaned copy is
+    written to disk.
+
+    source_key is unused here. It only feeds the datasets fingerprint: HF
+    caches from_generator output by function and kwargs, so passing the
+    content hash stops an in-place edit of the file from hitting a stale cache.
+    """
+    for path in source_files(input_file):
+        for row in _iter_raw_rows(path):
+            user_message = (row.get("user_message") or "").strip()
+            reply = (row.get("empathetic_reply") or "").strip()
+            if user_message and reply:
+                yield {"user_message": user_message, "empathetic_reply": reply}
+
+
+def preprocess_cache_key(input_file: str, tokenizer, max_length: int) -> str:
+    """Hash of (source file contents, tokenizer identity, max_length)."""
+    digest = hashlib.sha256()
+    for path in source_files(input_file):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    tokenizer_id = {
+        "name": getattr(tokenizer, "name_or_path", type(tokenizer).__name__),
+        "class": type(tokenizer).__name__,
+        "vocab_size": tokenizer.vocab_size,
+    }
+    digest.update(json.dumps(tokenizer_id, sort_keys=True).encode())
+    digest.update(str(max_length).encode())
+    return digest.hexdigest()[:16]
 
 
 # ------------------------------
-# 2. Load and preprocess dataset
+# 2. Load and preprocess dataset (cached)
 # ------------------------------
-def load_and_tokenize(tokenizer, dataset_path, max_length=128):
-    dataset = load_dataset("csv", data_files={"train": dataset_path}, encoding="utf-8-sig")
+def load_and_tokenize(
+    tokenizer,
+    dataset_path,
+    max_length=128,
+    cache_dir=PREPROCESS_CACHE_DIR,
+    num_proc=None,
+):
+    """
+    Returns the tokenized dataset, reusing Arrow shards from a previous run
+    when the source data, tokenizer and max_length are unchanged.
+    """
+    key = preprocess_cache_key(dataset_path, tokenizer, max_length)
+    shard_dir = os.path.join(cache_dir, key)
+    if os.path.isdir(shard_dir):
+        print(f"✅ Reusing preprocessed dataset from {shard_dir}")
+        return load_from_disk(shard_dir)
+
+    # from_generator writes rows to an Arrow cache file as they stream in,
+    # so datasets larger than RAM work the same way as small ones.
+    dataset = Dataset.from_generator(
+        iter_clean_rows, gen_kwargs={"input_file": dataset_path, "source_key": key}
+    )
 
     def preprocess(batch):
         inputs = [f"User: {q}" for q in batch["user_message"]]
@@ -32,52 +119,192 @@ def load_and_tokenize(tokenizer, dataset_path, max_length=128):
         model_inputs["labels"] = labels["input_ids"]
         return model_inputs
 
-    tokenized = dataset.map(preprocess, batched=True)
-    return tokenized["train"]
+    tokenized = dataset.map(
+        preprocess,
+        batched=True,
+        num_proc=num_proc or os.cpu_count(),
+        remove_columns=dataset.column_names,
+        desc="Tokenizing",
+    )
+
+    # Write to a temporary directory first so an interrupted run never
+    # leaves a half-written cache entry that later runs would trust.
+    tmp_dir = f"{shard_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tokenized.save_to_disk(tmp_dir, num_proc=num_proc)
+    os.replace(tmp_dir, shard_dir)
+    print(f"✅ Preprocessed dataset cached at {shard_dir}")
+    return load_from_disk(shard_dir)
 
 
 # ------------------------------
-# 3. Training function
+# 3. Training configuration
 # ------------------------------
-def train_mt5_empathy(input_csv="data/empathy.csv", output_dir="output/mt5-empathy"):
-    clean_csv(input_csv, "dataset_clean.csv")
+DEFAULT_CONFIG = {
+    "input_csv": "data/empathy.csv",
+    "output_dir": "output/mt5-empathy",
+    "model_name": "google/mt5-small",
+    "max_length": 128,
+    "num_proc": None,
+    "learning_rate": 5e-5,
+    "per_device_train_batch_size": 8,
+    "gradient_accumulation_steps": 1,
+    "num_train_epochs": 3,
+    "weight_decay": 0.01,
+    "gradient_checkpointing": False,
+    "bf16": "auto",                  # "auto", "on" or "off"
+    "num_threads": None,             # torch intra-op threads, defaults to all cores
+    "dataloader_num_workers": 0,
+    "eval_split": 0.1,               # 0 disables evaluation and early stopping
+    "early_stopping_patience": 3,
+    "eval_steps": 200,
+    "save_total_limit": 2,
+    "logging_steps": 50,
+    "resume": "auto",                # "auto", "never" or a checkpoint path
+    "seed": 42,
+}
 
-    model_name = "google/mt5-small"
-    tokenizer = MT5Tokenizer.from_pretrained(model_name)
-    model = MT5ForConditionalGeneration.from_pretrained(model_name)
 
-    train_dataset = load_and_tokenize(tokenizer, "dataset_clean.csv")
+def cpu_supports_bf16() -> bool:
+    """True when the CPU has native bf16 instructions (AVX512-BF16 or AMX)."""
+    import torch
 
+    if not torch.backends.mkldnn.is_available():
+        return False
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def load_config(argv=None) -> dict:
+    """Builds the training config from defaults, an optional JSON file and CLI flags."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fine-tune MT5 on the empathy dataset (CPU friendly).")
+    parser.add_argument("--config", help="JSON file with any of the config keys")
+    for key, default in DEFAULT_CONFIG.items():
+        flag = "--" + key.replace("_", "-")
+        if isinstance(default, bool):
+            parser.add_argument(flag, dest=key, action=argparse.BooleanOptionalAction, default=None)
+        elif isinstance(default, (int, float)) and default is not None:
+            parser.add_argument(flag, dest=key, type=type(default), default=None)
+        elif key in ("num_proc", "num_threads"):
+            parser.add_argument(flag, dest=key, type=int, default=None)
+        else:
+            parser.add_argument(flag, dest=key, default=None)
+    args = parser.parse_args(argv)
+
+    config = dict(DEFAULT_CONFIG)
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            file_config = json.load(f)
+        unknown = set(file_config) - set(DEFAULT_CONFIG)
+        if unknown:
+            parser.error(f"Unknown config keys: {', '.join(sorted(unknown))}")
+        config.update(file_config)
+    config.update({k: v for k, v in vars(args).items() if k != "config" and v is not None})
+    return config
+
+
+# ------------------------------
+# 4. Training function
+# ------------------------------
+def train_mt5_empathy(config=None):
+    import torch
+    from transformers import EarlyStoppingCallback
+    from transformers.trainer_utils import get_last_checkpoint
+
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    output_dir = config["output_dir"]
+
+    num_threads = config["num_threads"] or os.cpu_count()
+    torch.set_num_threads(num_threads)
+
+    if config["bf16"] == "auto":
+        use_bf16 = cpu_supports_bf16()
+    else:
+        use_bf16 = config["bf16"] == "on"
+    print(f"⚙️  Training on CPU with {num_threads} threads, bf16={'on' if use_bf16 else 'off'}")
+
+    tokenizer = MT5Tokenizer.from_pretrained(config["model_name"])
+    model = MT5ForConditionalGeneration.from_pretrained(config["model_name"])
+    if config["gradient_checkpointing"]:
+        # The KV cache is useless during training and incompatible with checkpointing
+        model.config.use_cache = False
+
+    dataset = load_and_tokenize(
+        tokenizer, config["input_csv"], max_length=config["max_length"], num_proc=config["num_proc"]
+    )
+    eval_dataset = None
+    if config["eval_split"] > 0:
+        split = dataset.train_test_split(test_size=config["eval_split"], seed=config["seed"])
+        train_dataset, eval_dataset = split["train"], split["test"]
+    else:
+        train_dataset = dataset
+
+    # Evaluation and checkpointing share one step schedule so the best
+    # checkpoint can be restored when early stopping kicks in.
+    strategy = "steps" if eval_dataset is not None else "epoch"
     training_args = Seq2SeqTrainingArguments(
         output_dir=output_dir,
-        evaluation_strategy="no",        # "no", "steps", or "epoch"
-        learning_rate=5e-5,
-        per_device_train_batch_size=8,
-        num_train_epochs=3,
-        weight_decay=0.01,
-        save_total_limit=2,
-        predict_with_generate=True,
-        logging_steps=50,
-        save_strategy="epoch",
+        use_cpu=True,
+        eval_strategy="steps" if eval_dataset is not None else "no",
+        eval_steps=config["eval_steps"],
+        save_strategy=strategy,
+        save_steps=config["eval_steps"],
+        load_best_model_at_end=eval_dataset is not None,
+        metric_for_best_model="eval_loss",
+        greater_is_better=False,
+        learning_rate=config["learning_rate"],
+        per_device_train_batch_size=config["per_device_train_batch_size"],
+        per_device_eval_batch_size=config["per_device_train_batch_size"],
+        gradient_accumulation_steps=config["gradient_accumulation_steps"],
+        gradient_checkpointing=config["gradient_checkpointing"],
+        bf16=use_bf16,
+        dataloader_num_workers=config["dataloader_num_workers"],
+        num_train_epochs=config["num_train_epochs"],
+        weight_decay=config["weight_decay"],
+        save_total_limit=config["save_total_limit"],
+        predict_with_generate=False,     # eval loss only; generation is slow on CPU
+        logging_steps=config["logging_steps"],
         logging_strategy="steps",
+        seed=config["seed"],
         push_to_hub=False,
     )
 
     data_collator = DataCollatorForSeq2Seq(tokenizer, model=model)
 
+    callbacks = []
+    if eval_dataset is not None and config["early_stopping_patience"]:
+        callbacks.append(EarlyStoppingCallback(early_stopping_patience=config["early_stopping_patience"]))
+
     trainer = Seq2SeqTrainer(
         model=model,
         args=training_args,
         train_dataset=train_dataset,
+        eval_dataset=eval_dataset,
         processing_class=tokenizer,   # ✅ replaces deprecated "tokenizer"
-        data_collator=data_collator
+        data_collator=data_collator,
+        callbacks=callbacks,
     )
 
-    trainer.train()
+    resume_from = None
+    if config["resume"] == "auto":
+        if os.path.isdir(output_dir):
+            resume_from = get_last_checkpoint(output_dir)
+    elif config["resume"] != "never":
+        resume_from = config["resume"]
+    if resume_from:
+        print(f"↩️  Resuming from checkpoint {resume_from}")
+
+    trainer.train(resume_from_checkpoint=resume_from)
     model.save_pretrained(output_dir)
     tokenizer.save_pretrained(output_dir)
     print(f"✅ Fine-tuned model saved to {output_dir}")
 
 
 if __name__ == "__main__":
-    train_mt5_empathy()
+    train_mt5_empathy(load_config())
@@ -26,6 +26,7 @@ export default function ChatbotPage() {
     const messageEndRef = useRef(null);
     const router = useRouter();
     const userId = user?.userId;
+    const token = user?.token;
 
     // 1. Protect the route
     useEffect(() => {
@@ -36,13 +37,15 @@ export default function ChatbotPage() {
 
     // 2. Fetch the user's ENTIRE chat history
     useEffect(() => {
-        if (!userId) return;
+        if (!userId || !token) return;
 
         const fetchHistory = async () => {
             setIsLoading(true);
             try {
                 // Calls the correct, simpler history endpoint
-                const response = await fetch(`${API_URL}/api/chat/history/${userId}`);
+                const response = await fetch(`${API_URL}/api/chat/history/${userId}`, {
+                    headers: { Authorization: `Bearer ${token}` },
+                });
                 if (response.ok) {
                     const history = await response.json();
                     const formatted = history.map(msg => ({ sender: msg.role === 'user' ? 'You' : 'Kairos', text: msg.content }));
@@ -57,22 +60,28 @@ export default function ChatbotPage() {
             }
         };
         fetchHistory();
-    }, [userId]);
+    }, [userId, token]);
 
     // 3. Connect to the WebSocket
     useEffect(() => {
-        if (!userId) return;
-        const ws = new WebSocket(`${WS_URL}/api/chat/ws/${userId}`);
+        if (!userId || !token) return;
+        // The token travels as a subprotocol so it stays out of URLs and access logs
+        const ws = new WebSocket(`${WS_URL}/api/chat/ws/${userId}`, ["bearer", token]);
         ws.onopen = () => console.log("WebSocket established");
         ws.onmessage = (event) => {
             const message = JSON.parse(event.data);
+            if (message.type === 'busy') {
+                // Admission control notice (turn queued or refused), not a reply
+                setChatMessages((prev) => [...prev, { sender: 'System', text: message.content }]);
+                return;
+            }
             setChatMessages((prev) => [...prev, { sender: 'Kairos', text: message.content }]);
         };
         ws.onerror = (error) => console.error("WebSocket error:", error);
         ws.onclose = () => console.log("WebSocket closed");
         websocket.current = ws;
         return () => { if (websocket.current) websocket.current.close(); };
-    }, [userId]);
+    }, [userId, token]);
 
     // 4. Auto-scroll to the bottom of the chat
     useEffect(() => {